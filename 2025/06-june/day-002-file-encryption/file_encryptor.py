@@ -13,31 +13,207 @@ import os
 import sys
 import getpass
 import argparse
+import fnmatch
+import hashlib
+import hmac
+import json
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 
+# Chunked container (version 2):
+#
+#   header  = MAGIC | version (1) | chunk size (4, big-endian) | session salt (16)
+#             | file salt (16) | nonce prefix (7)
+#   chunk_i = AES-256-GCM(plaintext_i) | tag (16)
+#
+# The file key is HKDF-SHA256(master key, file salt), where the master key is
+# PBKDF2(password, session salt) and is derived once for every file encrypted
+# in the same session. Version 1 had a single salt and used PBKDF2(password,
+# salt) as the file key directly; it is still decrypted.
+#
+# Every chunk holds chunk size plaintext bytes except the last, which may be
+# shorter or empty. Chunk i is sealed with the nonce prefix | i (4) | final (1),
+# where final is 1 only for the last chunk, and with the header as associated
+# data. Reordered, dropped, truncated or appended chunks therefore fail
+# authentication. Files without the magic are the original salt + Fernet format.
+MAGIC = b'FENC'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('>4sBI16s16s7s')
+HEADER_V1 = struct.Struct('>4sBI16s7s')
+HKDF_INFO = b'file-encryptor v2 file key'
+# Derived keys kept in memory so repeated decryptions skip PBKDF2
+KEY_CACHE_SIZE = 128
+
+# Directory mode
+ENCRYPTED_SUFFIX = '.enc'
+MANIFEST_NAME = '.fenc-manifest.json'
+DEFAULT_JOBS = 4
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def read_full(f, size: int) -> bytes:
+    """Read size bytes, or fewer only at the end of the stream."""
+    data = f.read(size)
+    while len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def iter_chunks(f, size: int):
+    """Yield (chunk, is_last) pairs; only the last chunk can be short."""
+    chunk = read_full(f, size)
+    while True:
+        following = read_full(f, size) if len(chunk) == size else b''
+        yield chunk, not following
+        if not following:
+            return
+        chunk = following
+
+
+def map_in_order(func, items, workers: int = 1):
+    """Yield func(*item) for every item, in order, computed on worker threads.
+    
+    At most two items per worker are in flight, so memory stays bounded by
+    that many chunks or files however far the slowest one holds up the
+    others. AES-GCM releases the GIL, so the threads run on separate cores.
+    """
+    if workers == 1:
+        for item in items:
+            yield func(*item)
+        return
+    
+    workers = workers or os.cpu_count()
+    with ThreadPoolExecutor(workers) as pool:
+        window = 2 * workers
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(func, *item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class HashingReader:
+    """Binary stream wrapper that hashes everything read through it."""
+    
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    """The 12-byte nonce of a chunk."""
+    if index >= 1 << 32:
+        raise ValueError("File has too many chunks for this chunk size")
+    return prefix + struct.pack('>IB', index, last)
+
 
 class FileEncryptor:
-    """A simple file encryption/decryption tool using Fernet (AES 128)."""
+    """A simple file encryption/decryption tool using chunked AES-256-GCM.
+
+    Files written by older versions (salt + Fernet token) can still be decrypted.
+    """
     
-    def __init__(self):
+    def __init__(self, workers: int = 1):
         self.key = None
         self.fernet = None
+        # Threads sealing or opening chunks; 0 uses every core
+        self.workers = workers
+        # Every file encrypted by this instance shares one master key derivation
+        self.session_salt = os.urandom(16)
+        # (password HMAC, salt) -> PBKDF2 key, least recently used first
+        self._keys = OrderedDict()
+        self._keys_lock = threading.Lock()
+        # cache key -> lock held while that key is derived, so concurrent misses derive it once
+        self._deriving = {}
+        self._cache_secret = os.urandom(32)
     
-    def derive_key_from_password(self, password: str, salt: bytes) -> bytes:
-        """Derive a key from password using PBKDF2."""
+    def derive_raw_key(self, password: str, salt: bytes) -> bytes:
+        """Derive a 32-byte key from password using PBKDF2, cached per (password, salt)."""
         password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
+        # The cache is indexed by a keyed hash, so it never holds the password itself
+        cache_key = (hmac.new(self._cache_secret, password_bytes, hashlib.sha256).digest(), salt)
+        with self._keys_lock:
+            key = self._cached_key(cache_key)
+            if key is not None:
+                return key
+            deriving = self._deriving.setdefault(cache_key, threading.Lock())
+        
+        with deriving:
+            # Another thread may have derived it while this one waited
+            with self._keys_lock:
+                key = self._cached_key(cache_key)
+            if key is not None:
+                return key
+            try:
+                kdf = PBKDF2HMAC(
+                    algorithm=hashes.SHA256(),
+                    length=32,
+                    salt=salt,
+                    iterations=100000,
+                )
+                key = kdf.derive(password_bytes)
+                with self._keys_lock:
+                    self._keys[cache_key] = key
+                    if len(self._keys) > KEY_CACHE_SIZE:
+                        self._keys.popitem(last=False)
+            finally:
+                with self._keys_lock:
+                    self._deriving.pop(cache_key, None)
+        return key
+    
+    def _cached_key(self, cache_key):
+        """The cached key or None; the caller holds _keys_lock."""
+        key = self._keys.get(cache_key)
+        if key is not None:
+            self._keys.move_to_end(cache_key)
         return key
     
+    def derive_file_key(self, password: str, session_salt: bytes, file_salt: bytes) -> bytes:
+        """Derive a file's key from the session master key with HKDF."""
+        master = self.derive_raw_key(password, session_salt)
+        return HKDF(algorithm=hashes.SHA256(), length=32, salt=file_salt, info=HKDF_INFO).derive(master)
+    
+    def derive_key_from_password(self, password: str, salt: bytes) -> bytes:
+        """Derive a Fernet key from password using PBKDF2."""
+        return base64.urlsafe_b64encode(self.derive_raw_key(password, salt))
+    
     def setup_encryption(self, password: str, salt: bytes = None) -> bytes:
         """Set up encryption with a password."""
         if salt is None:
@@ -47,22 +223,106 @@ class FileEncryptor:
         self.fernet = Fernet(self.key)
         return salt
     
-    def encrypt_file(self, input_file: str, output_file: str, password: str) -> bool:
+    def encrypt_stream(self, src, dst, password: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Encrypt binary stream src into dst, holding one chunk in memory at a time."""
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes")
+        file_salt = os.urandom(16)
+        prefix = os.urandom(7)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, chunk_size, self.session_salt, file_salt, prefix)
+        aead = AESGCM(self.derive_file_key(password, self.session_salt, file_salt))
+        
+        def seal(index, item):
+            chunk, last = item
+            return aead.encrypt(chunk_nonce(prefix, index, last), chunk, header)
+        
+        dst.write(header)
+        for sealed in map_in_order(seal, enumerate(iter_chunks(src, chunk_size)), self.workers):
+            dst.write(sealed)
+    
+    def decrypt_stream(self, src, dst, password: str):
+        """Decrypt a chunked container from src into dst, chunk by chunk."""
+        header = read_full(src, 5)
+        version = header[4] if len(header) == 5 else None
+        layout = {1: HEADER_V1, FORMAT_VERSION: HEADER}.get(version)
+        if header[:4] != MAGIC or layout is None:
+            raise ValueError(f"Unsupported file format version: {version}")
+        header += read_full(src, layout.size - len(header))
+        if len(header) < layout.size:
+            raise ValueError("File is too short to be encrypted")
+        
+        fields = layout.unpack(header)
+        chunk_size, prefix = fields[2], fields[-1]
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError("Corrupted header: invalid chunk size")
+        if version == 1:
+            aead = AESGCM(self.derive_raw_key(password, fields[3]))
+        else:
+            aead = AESGCM(self.derive_file_key(password, fields[3], fields[4]))
+        
+        def open_chunk(index, item):
+            chunk, last = item
+            return aead.decrypt(chunk_nonce(prefix, index, last), chunk, header)
+        
+        chunks = enumerate(iter_chunks(src, chunk_size + TAG_SIZE))
+        try:
+            for plaintext in map_in_order(open_chunk, chunks, self.workers):
+                dst.write(plaintext)
+        except InvalidTag:
+            raise ValueError("Wrong password or corrupted file") from None
+    
+    def decrypt_legacy(self, src, dst, password: str):
+        """Decrypt the original single-token format: salt (16) + Fernet token."""
+        file_data = src.read()
+        
+        # Extract salt (first 16 bytes) and encrypted data
+        salt = file_data[:16]
+        encrypted_data = file_data[16:]
+        
+        # A local Fernet instead of self.fernet, so threads can share this encryptor
+        fernet = Fernet(self.derive_key_from_password(password, salt))
+        dst.write(fernet.decrypt(encrypted_data))
+    
+    def _write_atomically(self, output_file: str, write):
+        """Run write(f) on a temporary file that replaces output_file only on success.
+        
+        A failed decryption never leaves unauthenticated plaintext behind.
+        """
+        directory = os.path.dirname(os.path.abspath(output_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(output_file),
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, output_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def encrypt_path(self, input_file: str, output_file: str, password: str,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+        """Encrypt a file, raising on failure; returns the SHA-256 of the input."""
+        with open(input_file, 'rb') as f:
+            src = HashingReader(f)
+            self._write_atomically(
+                output_file, lambda dst: self.encrypt_stream(src, dst, password, chunk_size))
+        return src.digest.hexdigest()
+    
+    def decrypt_path(self, input_file: str, output_file: str, password: str) -> str:
+        """Decrypt a file, raising on failure; returns the SHA-256 of the input."""
+        with open(input_file, 'rb') as f:
+            chunked = f.read(len(MAGIC)) == MAGIC
+            f.seek(0)
+            src = HashingReader(f)
+            decrypt = self.decrypt_stream if chunked else self.decrypt_legacy
+            self._write_atomically(output_file, lambda dst: decrypt(src, dst, password))
+        return src.digest.hexdigest()
+    
+    def encrypt_file(self, input_file: str, output_file: str, password: str,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
         """Encrypt a file."""
         try:
-            # Generate salt for key derivation
-            salt = self.setup_encryption(password)
-            
-            # Read the original file
-            with open(input_file, 'rb') as f:
-                file_data = f.read()
-            
-            # Encrypt the data
-            encrypted_data = self.fernet.encrypt(file_data)
-            
-            # Write salt + encrypted data to output file
-            with open(output_file, 'wb') as f:
-                f.write(salt + encrypted_data)
+            self.encrypt_path(input_file, output_file, password, chunk_size)
             
             print(f"✅ File encrypted successfully: {output_file}")
             return True
@@ -72,32 +332,123 @@ class FileEncryptor:
             return False
     
     def decrypt_file(self, input_file: str, output_file: str, password: str) -> bool:
-        """Decrypt a file."""
+        """Decrypt a file in the chunked format or the original Fernet format."""
         try:
-            # Read the encrypted file
-            with open(input_file, 'rb') as f:
-                file_data = f.read()
-            
-            # Extract salt (first 16 bytes) and encrypted data
-            salt = file_data[:16]
-            encrypted_data = file_data[16:]
-            
-            # Setup decryption with the same salt
-            self.setup_encryption(password, salt)
-            
-            # Decrypt the data
-            decrypted_data = self.fernet.decrypt(encrypted_data)
-            
-            # Write decrypted data to output file
-            with open(output_file, 'wb') as f:
-                f.write(decrypted_data)
+            self.decrypt_path(input_file, output_file, password)
             
             print(f"✅ File decrypted successfully: {output_file}")
             return True
             
         except Exception as e:
-            print(f"❌ Decryption failed: {str(e)}")
+            print(f"❌ Decryption failed: {str(e) or type(e).__name__}")
+            return False
+    
+    def process_directory(self, mode: str, input_dir: str, output_dir: str, password: str,
+                          pattern: str = '*', jobs: int = DEFAULT_JOBS,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+        """Encrypt or decrypt every file under input_dir into output_dir.
+        
+        Relative paths, permissions and timestamps are kept; encrypting adds
+        ENCRYPTED_SUFFIX to each name and decrypting removes it. jobs files are
+        processed at once (0 uses every core). A manifest in output_dir records
+        each input's size, mtime and SHA-256, so a rerun skips inputs that were
+        already processed: an unchanged size and mtime skip without reading,
+        an unchanged hash skips without writing. When encrypting, inputs that
+        already carry the encrypted header are skipped too.
+        Returns counts of processed, skipped and failed files, bytes, seconds
+        and the (path, error) of every failure.
+        """
+        if mode not in ('encrypt', 'decrypt'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {'files': {}}
+        if manifest.get('mode', mode) != mode:
+            raise ValueError(f"{output_dir} holds {manifest['mode']}ed output")
+        entries = manifest['files']
+        
+        def output_name(rel: str) -> str:
+            if mode == 'encrypt':
+                return rel + ENCRYPTED_SUFFIX
+            return rel[:-len(ENCRYPTED_SUFFIX)] if rel.endswith(ENCRYPTED_SUFFIX) else rel
+        
+        def up_to_date(rel: str, path: str, st) -> bool:
+            entry = entries.get(rel)
+            if not entry or entry.get('error') or not os.path.exists(os.path.join(output_dir, entry['output'])):
+                return False
+            if entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+                return True
+            if entry['sha256'] == file_sha256(path):
+                entry['mtime'] = st.st_mtime
+                return True
             return False
+        
+        report = {'processed': 0, 'skipped': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0, 'errors': []}
+        todo = []
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for name in sorted(fnmatch.filter(files, pattern)):
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, input_dir).replace(os.sep, '/')
+                if name == MANIFEST_NAME or os.path.abspath(path) == os.path.abspath(manifest_path):
+                    continue
+                # A dangling link or unreadable file fails on its own, like a failed run()
+                try:
+                    st = os.stat(path)
+                    if up_to_date(rel, path, st):
+                        report['skipped'] += 1
+                        continue
+                    if mode == 'encrypt':
+                        with open(path, 'rb') as f:
+                            if f.read(len(MAGIC)) == MAGIC:
+                                report['skipped'] += 1
+                                continue
+                except OSError as e:
+                    entries[rel] = {'output': output_name(rel), 'error': str(e) or type(e).__name__}
+                    report['failed'] += 1
+                    report['errors'].append((rel, entries[rel]['error']))
+                    continue
+                todo.append((rel, path, st))
+        
+        process = self.encrypt_path if mode == 'encrypt' else self.decrypt_path
+        
+        def run(rel, path, st):
+            output = os.path.join(output_dir, *output_name(rel).split('/'))
+            try:
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                if mode == 'encrypt':
+                    sha256 = process(path, output, password, chunk_size)
+                else:
+                    sha256 = process(path, output, password)
+                shutil.copystat(path, output)
+                return rel, {'output': output_name(rel), 'size': st.st_size, 'mtime': st.st_mtime,
+                             'sha256': sha256}
+            except Exception as e:
+                return rel, {'output': output_name(rel), 'error': str(e) or type(e).__name__}
+        
+        os.makedirs(output_dir, exist_ok=True)
+        if mode == 'encrypt' and todo:
+            self.derive_raw_key(password, self.session_salt)  # one KDF before the workers start
+        
+        start = time.perf_counter()
+        try:
+            for rel, entry in map_in_order(run, todo, jobs):
+                entries[rel] = entry
+                if 'error' in entry:
+                    report['failed'] += 1
+                    report['errors'].append((rel, entry['error']))
+                else:
+                    report['processed'] += 1
+                    report['bytes'] += entry['size']
+        finally:
+            report['seconds'] = time.perf_counter() - start
+            manifest['mode'] = mode
+            self._write_atomically(manifest_path, lambda f: f.write(
+                json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')))
+        return report
 
 
 def main():
@@ -111,16 +462,39 @@ def main():
     )
     parser.add_argument(
         'input_file', 
-        help='Input file path'
+        help='Input file path, or a directory to process every file in it'
     )
     parser.add_argument(
         'output_file', 
-        help='Output file path'
+        help='Output file path, or output directory in directory mode'
     )
     parser.add_argument(
         '--password', 
         help='Encryption password (will prompt if not provided)'
     )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f'Plaintext bytes per authenticated chunk when encrypting (default: {DEFAULT_CHUNK_SIZE})'
+    )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='Threads encrypting or decrypting chunks; 0 uses every core (default: 1)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f'Files processed at once in directory mode; 0 uses every core (default: {DEFAULT_JOBS})'
+    )
+    parser.add_argument(
+        '--pattern',
+        default='*',
+        help="File name pattern of files to process in directory mode (default: '*')"
+    )
     
     args = parser.parse_args()
     
@@ -140,11 +514,29 @@ def main():
         sys.exit(1)
     
     # Create encryptor instance
-    encryptor = FileEncryptor()
+    encryptor = FileEncryptor(args.workers)
     
     # Perform operation
+    if os.path.isdir(args.input_file):
+        try:
+            report = encryptor.process_directory(args.mode, args.input_file, args.output_file, password,
+                                                 args.pattern, args.jobs, args.chunk_size)
+        except (OSError, ValueError) as e:
+            print(f"❌ Directory {args.mode}ion failed: {e}")
+            sys.exit(1)
+        
+        seconds = report['seconds']
+        rate = report['bytes'] / seconds / 1e6 if seconds else 0.0
+        print(f"✅ {report['processed']} files {args.mode}ed, {report['skipped']} skipped, "
+              f"{report['failed']} failed")
+        print(f"📊 {report['bytes'] / 1e6:.1f} MB in {seconds:.2f}s ({rate:.1f} MB/s)")
+        for path, error in report['errors']:
+            print(f"❌ {path}: {error}")
+        sys.exit(1 if report['failed'] else 0)
+    
     if args.mode == 'encrypt':
-        success = encryptor.encrypt_file(args.input_file, args.output_file, password)
+        success = encryptor.encrypt_file(args.input_file, args.output_file, password,
+                                         args.chunk_size)
     else:
         success = encryptor.decrypt_file(args.input_file, args.output_file, password)
     
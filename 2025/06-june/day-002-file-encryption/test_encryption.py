@@ -3,9 +3,14 @@
 Test script for the file encryption tool
 """
 
+import json
 import os
 import tempfile
-from file_encryptor import FileEncryptor
+from unittest import mock
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+import file_encryptor
+from file_encryptor import FileEncryptor, HEADER, HEADER_V1, MAGIC, MANIFEST_NAME, TAG_SIZE, chunk_nonce
 
 def test_encryption_decryption():
     """Test basic encryption and decryption functionality."""
@@ -81,9 +86,229 @@ def test_wrong_password():
             if os.path.exists(path):
                 os.unlink(path)
 
+def test_chunked_format():
+    """Test chunk boundaries, size overhead and tamper detection of the chunked format."""
+    encryptor = FileEncryptor()
+    password = "chunked_password"
+    chunk_size = 16
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path = os.path.join(tmp, "original")
+        encrypted_path = os.path.join(tmp, "encrypted")
+        decrypted_path = os.path.join(tmp, "decrypted")
+        
+        for size in [0, 1, 15, 16, 17, 48, 100]:
+            content = os.urandom(size)
+            with open(original_path, 'wb') as f:
+                f.write(content)
+            
+            assert encryptor.encrypt_file(original_path, encrypted_path, password, chunk_size)
+            chunks = size // chunk_size + 1 if size % chunk_size else max(size // chunk_size, 1)
+            assert os.path.getsize(encrypted_path) == HEADER.size + size + chunks * TAG_SIZE, \
+                "Ciphertext should only add a header and one tag per chunk"
+            
+            assert encryptor.decrypt_file(encrypted_path, decrypted_path, password)
+            with open(decrypted_path, 'rb') as f:
+                assert f.read() == content, f"Round trip failed for {size} bytes"
+        
+        with open(encrypted_path, 'rb') as f:
+            encrypted = f.read()
+        os.unlink(decrypted_path)
+        
+        # Truncated at a chunk boundary, truncated mid-chunk, extended and flipped
+        tampered = [
+            encrypted[:-(chunk_size + TAG_SIZE)],
+            encrypted[:-1],
+            encrypted + encrypted[-(chunk_size + TAG_SIZE):],
+            encrypted[:HEADER.size + 3] + bytes([encrypted[HEADER.size + 3] ^ 1]) + encrypted[HEADER.size + 4:],
+        ]
+        for data in tampered:
+            with open(encrypted_path, 'wb') as f:
+                f.write(data)
+            assert not encryptor.decrypt_file(encrypted_path, decrypted_path, password), \
+                "Tampered file should not decrypt"
+            assert not os.path.exists(decrypted_path), "No partial plaintext should be left behind"
+        
+        print("✅ Chunked format test passed!")
+
+def test_legacy_format():
+    """Test that files in the original salt + Fernet format still decrypt."""
+    encryptor = FileEncryptor()
+    password = "legacy_password"
+    content = b"Written by an older version"
+    salt = os.urandom(16)
+    token = Fernet(encryptor.derive_key_from_password(password, salt)).encrypt(content)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        encrypted_path = os.path.join(tmp, "legacy.bin")
+        decrypted_path = os.path.join(tmp, "legacy.txt")
+        with open(encrypted_path, 'wb') as f:
+            f.write(salt + token)
+        
+        assert encryptor.decrypt_file(encrypted_path, decrypted_path, password)
+        with open(decrypted_path, 'rb') as f:
+            assert f.read() == content
+        
+        assert not FileEncryptor().decrypt_file(encrypted_path, decrypted_path + ".wrong", "wrong")
+        print("✅ Legacy format test passed!")
+
+def test_parallel_matches_serial():
+    """Test that parallel encryption writes exactly the single-threaded bytes."""
+    password = "parallel_password"
+    content = os.urandom(10000)
+    fixed_random = lambda n: bytes(range(n))  # same salt and nonce prefix for both runs
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        original_path = os.path.join(tmp, "original")
+        with open(original_path, 'wb') as f:
+            f.write(content)
+        
+        outputs = {}
+        for workers in [1, 4]:
+            encrypted_path = os.path.join(tmp, f"encrypted-{workers}")
+            with mock.patch('file_encryptor.os.urandom', fixed_random):
+                assert FileEncryptor(workers).encrypt_file(original_path, encrypted_path, password, 64)
+            with open(encrypted_path, 'rb') as f:
+                outputs[workers] = f.read()
+        assert outputs[1] == outputs[4], "Parallel output differs from serial output"
+        
+        decrypted_path = os.path.join(tmp, "decrypted")
+        assert FileEncryptor(4).decrypt_file(encrypted_path, decrypted_path, password)
+        with open(decrypted_path, 'rb') as f:
+            assert f.read() == content
+        
+        with open(encrypted_path, 'wb') as f:
+            f.write(outputs[4][:-1])
+        assert not FileEncryptor(4).decrypt_file(encrypted_path, decrypted_path + "2", password)
+        assert not FileEncryptor(4).decrypt_file(encrypted_path, decrypted_path + "2", "wrong")
+        
+        print("✅ Parallel test passed!")
+
+def test_one_key_derivation_per_session():
+    """Test that a batch of files costs one PBKDF2 call to encrypt and one to decrypt."""
+    password = "session_password"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(5):
+            path = os.path.join(tmp, f"file{i}")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(100 * i))
+            paths.append(path)
+        
+        with mock.patch.object(file_encryptor, 'PBKDF2HMAC', wraps=file_encryptor.PBKDF2HMAC) as kdf:
+            encryptor = FileEncryptor()
+            for path in paths:
+                assert encryptor.encrypt_file(path, path + ".enc", password)
+            assert kdf.call_count == 1, "Encryption should derive the master key once"
+            
+            decryptor = FileEncryptor()
+            for path in paths + paths:
+                assert decryptor.decrypt_file(path + ".enc", path + ".dec", password)
+                with open(path, 'rb') as a, open(path + ".dec", 'rb') as b:
+                    assert a.read() == b.read()
+            assert kdf.call_count == 2, "Decryption should derive the master key once"
+            
+            for path in paths:
+                os.unlink(path + ".dec")
+            report = FileEncryptor().process_directory('decrypt', tmp, os.path.join(tmp, "out"),
+                                                       password, pattern="*.enc", jobs=4)
+            assert report['processed'] == len(paths)
+            assert kdf.call_count == 3, "Parallel decryption should derive the master key once"
+        
+        headers = []
+        for path in paths:
+            with open(path + ".enc", 'rb') as f:
+                headers.append(HEADER.unpack(f.read(HEADER.size)))
+        assert len({h[3] for h in headers}) == 1, "Files of a session share the session salt"
+        assert len({h[4] for h in headers}) == len(paths), "Every file gets its own file salt"
+        
+        print("✅ Key derivation test passed!")
+
+def test_version_1_format():
+    """Test that chunked files without a session salt still decrypt."""
+    encryptor = FileEncryptor()
+    password = "v1_password"
+    content = os.urandom(40)
+    salt, prefix = os.urandom(16), os.urandom(7)
+    header = HEADER_V1.pack(MAGIC, 1, 16, salt, prefix)
+    aead = AESGCM(encryptor.derive_raw_key(password, salt))
+    chunks = [content[0:16], content[16:32], content[32:]]
+    sealed = [aead.encrypt(chunk_nonce(prefix, i, i == 2), chunk, header) for i, chunk in enumerate(chunks)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        encrypted_path = os.path.join(tmp, "v1.bin")
+        decrypted_path = os.path.join(tmp, "v1.out")
+        with open(encrypted_path, 'wb') as f:
+            f.write(header + b''.join(sealed))
+        
+        assert FileEncryptor().decrypt_file(encrypted_path, decrypted_path, password)
+        with open(decrypted_path, 'rb') as f:
+            assert f.read() == content
+        print("✅ Version 1 format test passed!")
+
+def test_directory_mode():
+    """Test recursive directory encryption, skipping on rerun and the manifest."""
+    password = "directory_password"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        encrypted = os.path.join(tmp, "encrypted")
+        decrypted = os.path.join(tmp, "decrypted")
+        contents = {"a.txt": b"first", "sub/b.bin": os.urandom(1000), "sub/deeper/c.txt": b""}
+        for rel, content in contents.items():
+            path = os.path.join(source, *rel.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+        os.chmod(os.path.join(source, "a.txt"), 0o600)
+        os.utime(os.path.join(source, "a.txt"), (1000000000, 1000000000))
+        
+        report = FileEncryptor().process_directory('encrypt', source, encrypted, password, jobs=3)
+        assert (report['processed'], report['skipped'], report['failed']) == (3, 0, 0)
+        assert os.path.exists(os.path.join(encrypted, "sub", "deeper", "c.txt.enc"))
+        
+        report = FileEncryptor().process_directory('encrypt', source, encrypted, password)
+        assert (report['processed'], report['skipped']) == (0, 3), "Unchanged files should be skipped"
+        
+        with open(os.path.join(source, "sub", "b.bin"), 'ab') as f:
+            f.write(b"more")
+        contents["sub/b.bin"] += b"more"
+        report = FileEncryptor().process_directory('encrypt', source, encrypted, password)
+        assert (report['processed'], report['skipped']) == (1, 2), "Changed files should be redone"
+        
+        with open(os.path.join(encrypted, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        assert sorted(manifest['files']) == sorted(contents)
+        
+        report = FileEncryptor().process_directory('decrypt', encrypted, decrypted, password, jobs=2)
+        assert (report['processed'], report['failed']) == (3, 0)
+        for rel, content in contents.items():
+            with open(os.path.join(decrypted, *rel.split('/')), 'rb') as f:
+                assert f.read() == content, f"{rel} did not round trip"
+        st = os.stat(os.path.join(decrypted, "a.txt"))
+        assert st.st_mode & 0o777 == 0o600 and st.st_mtime == 1000000000, "Metadata should be kept"
+        
+        report = FileEncryptor().process_directory('decrypt', encrypted, decrypted + "2", "wrong")
+        assert report['failed'] == 3 and len(report['errors']) == 3
+        
+        os.symlink("missing", os.path.join(source, "dangling"))
+        report = FileEncryptor().process_directory('encrypt', source, encrypted, password)
+        assert (report['skipped'], report['failed']) == (3, 1), "A broken file should not stop the run"
+        with open(os.path.join(encrypted, MANIFEST_NAME)) as f:
+            assert 'error' in json.load(f)['files']['dangling'], "The manifest should record it"
+        
+        print("✅ Directory mode test passed!")
+
 if __name__ == "__main__":
     print("Running encryption tool tests...")
     test_encryption_decryption()
     test_wrong_password()
+    test_chunked_format()
+    test_legacy_format()
+    test_parallel_matches_serial()
+    test_one_key_derivation_per_session()
+    test_version_1_format()
+    test_directory_mode()
     print("\n✨ All tests completed successfully!")
 
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Word Counter Tool.
+
+Generates synthetic corpora (Zipf-distributed vocabulary, configurable
+sentence length) from 1 MB up to several GB, times every WordCounter
+method, the streaming engines and the end-to-end CLI, and records
+throughput and peak memory to JSON for comparison against a baseline.
+
+    python benchmark.py --quick --save-baseline
+    python benchmark.py --quick --threshold 0.15
+    python benchmark.py --sizes 1MB 100MB 2GB --targets analyze_mmap cli-mmap
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import string
+import subprocess
+import sys
+import time
+
+import word_counter
+from word_counter import WordCounter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SIZES = ['1MB', '10MB', '100MB']
+QUICK_SIZES = ['1MB']
+
+# Every public WordCounter query, each timed on a fresh counter
+METHODS = [
+    'character_count', 'word_count', 'line_count', 'sentence_count',
+    'paragraph_count', 'word_frequency', 'unique_word_count',
+    'average_word_length', 'average_sentence_length', 'longest_word',
+    'shortest_word', 'reading_time', 'character_frequency',
+    'get_comprehensive_stats',
+]
+
+# Engines that read the file themselves
+ENGINES = {
+    'load_from_file': lambda path: WordCounter().load_from_file(path),
+    'analyze_file': word_counter.analyze_file,
+    'analyze_file_parallel': lambda path: word_counter.analyze_file_parallel(path, workers=0),
+    'analyze_mmap': word_counter.analyze_mmap,
+}
+
+# End-to-end command lines, run as a separate interpreter
+CLI = {
+    'cli': [],
+    'cli-stream': ['--stream'],
+    'cli-mmap': ['--mmap'],
+    'cli-frequency': ['--frequency'],
+}
+
+TARGETS = [f'WordCounter.{m}' for m in METHODS] + list(ENGINES) + list(CLI)
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_CORPUS_DIR = 'bench_corpus'
+
+_UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+
+
+def parse_size(text):
+    """Parses '1MB', '512KB' or '2GB' into bytes."""
+    text = text.strip().upper()
+    for unit, factor in _UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def _vocabulary(rng, size):
+    """Distinct pseudo-words with mostly short lengths, like natural text."""
+    words = set()
+    while len(words) < size:
+        length = min(1 + int(rng.expovariate(1 / 4)), 18)
+        words.add(''.join(rng.choices(string.ascii_lowercase, k=length)))
+    return sorted(words, key=lambda w: (len(w), w))
+
+
+def generate_corpus(path, size, vocabulary=50000, zipf=1.1, sentence_length=15,
+                    paragraph_length=6, seed=0):
+    """Writes a synthetic corpus of about size bytes to path.
+
+    Word ranks follow a Zipf distribution with exponent zipf over a fixed
+    vocabulary, sentence lengths vary around sentence_length words and
+    paragraphs hold about paragraph_length sentences. Text is written in
+    blocks, so gigabyte corpora never sit in memory.
+    """
+    rng = random.Random(seed)
+    words = _vocabulary(rng, vocabulary)
+    rng.shuffle(words)  # rank must not correlate with word length
+    cum_weights = list(itertools.accumulate(1 / rank ** zipf for rank in range(1, vocabulary + 1)))
+    endings = ['.'] * 17 + ['?'] * 2 + ['!']
+
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < size:
+            sampled = rng.choices(words, cum_weights=cum_weights, k=20000)
+            block = []
+            at = 0
+            while at < len(sampled):
+                length = max(1, int(rng.gauss(sentence_length, sentence_length / 3)))
+                sentence = sampled[at:at + length]
+                at += length
+                sentence[0] = sentence[0].capitalize()
+                block.append(' '.join(sentence) + rng.choice(endings))
+                block.append('\n\n' if rng.random() < 1 / paragraph_length else ' ')
+            text = ''.join(block)[:size - written]
+            f.write(text)
+            written += len(text)
+    return path
+
+
+def corpus_path(directory, size, args):
+    """Creates a corpus on first use and returns its path."""
+    name = (f'corpus-{size}-v{args.vocabulary}-z{args.zipf}'
+            f'-s{args.sentence_length}-seed{args.seed}.txt')
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        print(f"📝 Generating {path}...")
+        generate_corpus(path + '.tmp', size, args.vocabulary, args.zipf,
+                        args.sentence_length, seed=args.seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def _peak_rss_bytes(who=resource.RUSAGE_SELF):
+    """Returns the peak resident set size of this process or of its children."""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_case(target, path, repeat):
+    """Times one target on one corpus and returns its best time; runs in a fresh process."""
+    timings = []
+    if target.startswith('WordCounter.'):
+        method = target.split('.', 1)[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        baseline_rss = _peak_rss_bytes()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            getattr(WordCounter(text), method)()
+            timings.append(time.perf_counter() - start)
+        # The text itself is loaded outside the timing; report what the method added
+        peak = _peak_rss_bytes() - baseline_rss
+    elif target in ENGINES:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ENGINES[target](path)
+            timings.append(time.perf_counter() - start)
+        peak = _peak_rss_bytes()
+    else:
+        command = [sys.executable, os.path.join(HERE, 'word_counter.py'), path] + CLI[target]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - start)
+        peak = _peak_rss_bytes(resource.RUSAGE_CHILDREN)
+
+    size = os.path.getsize(path)
+    best = min(timings)
+    return {
+        'id': f'{target}/{size}',
+        'target': target,
+        'bytes': size,
+        'seconds': best,
+        'mb_per_second': size / best / 1e6 if best else float('inf'),
+        'peak_rss_bytes': peak,
+    }
+
+
+def run_matrix(cases, repeat=3):
+    """Runs every case in its own process so peak RSS is measured per case."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for target, path in cases:
+        with context.Pool(1) as pool:
+            result = pool.apply(_run_case, (target, path, repeat))
+        results.append(result)
+        print(f"{result['id']:<48} {result['mb_per_second']:9.2f} MB/s  "
+              f"{result['seconds'] * 1000:9.1f} ms  "
+              f"rss {result['peak_rss_bytes'] / 2**20:7.1f} MiB")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns a description of every case that regressed beyond threshold."""
+    previous = {r['id']: r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['id'])
+        if old is None:
+            continue
+
+        checks = [
+            ('mb_per_second', result['mb_per_second'] < old['mb_per_second'] * (1 - threshold)),
+            ('peak_rss_bytes', result['peak_rss_bytes'] > old['peak_rss_bytes'] * (1 + threshold)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{result['id']}: {metric} {old[metric]:.4g} -> {result[metric]:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the word counter")
+    parser.add_argument('--quick', action='store_true',
+                        help='1 MB corpus only, for a fast check')
+    parser.add_argument('--sizes', nargs='+', default=SIZES,
+                        help=f"Corpus sizes such as 1MB or 2GB (default: {' '.join(SIZES)})")
+    parser.add_argument('--targets', nargs='+', default=TARGETS, choices=TARGETS, metavar='TARGET',
+                        help='Methods, engines and CLI modes to time (default: all)')
+    parser.add_argument('--vocabulary', type=int, default=50000,
+                        help='Distinct words in the corpus (default: 50000)')
+    parser.add_argument('--zipf', type=float, default=1.1,
+                        help='Zipf exponent of word frequencies (default: 1.1)')
+    parser.add_argument('--sentence-length', type=int, default=15,
+                        help='Average words per sentence (default: 15)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed of the corpus (default: 0)')
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR,
+                        help=f'Where generated corpora are kept (default: {DEFAULT_CORPUS_DIR})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per case; the fastest one is reported (default: 3)')
+    parser.add_argument('--output', '-o', default='benchmark_results.json',
+                        help='Where to write the results (default: benchmark_results.json)')
+    parser.add_argument('--baseline', '-b', default=DEFAULT_BASELINE,
+                        help=f'Baseline to compare against (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store these results as the new baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown counted as a regression (default: 0.10)')
+
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    corpora = [corpus_path(args.corpus_dir, parse_size(size), args) for size in sizes]
+    cases = list(itertools.product(args.targets, corpora))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'corpus': {
+                'vocabulary': args.vocabulary,
+                'zipf': args.zipf,
+                'sentence_length': args.sentence_length,
+                'seed': args.seed,
+            },
+        },
+        'results': run_matrix(cases, args.repeat),
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    regressions = compare(report['results'], baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
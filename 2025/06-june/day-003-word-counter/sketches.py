@@ -0,0 +1,142 @@
+"""
+Fixed-memory, mergeable sketches for word statistics on unbounded streams.
+
+SpaceSaving keeps the heavy hitters (top-N words) in a fixed number of
+counters and HyperLogLog estimates the number of distinct words in a fixed
+number of registers. Both merge exactly like the streams they summarize,
+so shards and worker processes can be sketched separately and combined.
+"""
+
+import hashlib
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+DEFAULT_CAPACITY = 1000
+DEFAULT_PRECISION = 14
+
+
+def _hash64(word: str) -> int:
+    """Stable 64-bit hash; unlike hash() it is the same in every process."""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary with a fixed number of counters.
+
+    Every reported count overestimates the true count by at most its error,
+    and no word whose true count exceeds total / capacity is ever missed.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}   # word -> [count, error]
+        self._heap = []    # (count, word) entries, stale ones skipped lazily
+
+    def _pop_min(self) -> Tuple[str, int, int]:
+        """Remove and return the word with the smallest count."""
+        while True:
+            count, word = heapq.heappop(self._heap)
+            entry = self.counts.get(word)
+            if entry is not None and entry[0] == count:
+                del self.counts[word]
+                return word, count, entry[1]
+
+    def _push(self, word: str, count: int):
+        heapq.heappush(self._heap, (count, word))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, w) for w, (c, _) in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, counts: Dict[str, int]):
+        """Adds occurrences of words, e.g. a Counter of one segment."""
+        for word, n in counts.items():
+            self.total += n
+            entry = self.counts.get(word)
+            if entry is not None:
+                entry[0] += n
+            elif len(self.counts) < self.capacity:
+                entry = self.counts[word] = [n, 0]
+            else:
+                # Evict the smallest counter; the newcomer may have had that many
+                _, floor, _ = self._pop_min()
+                entry = self.counts[word] = [floor + n, floor]
+            self._push(word, entry[0])
+
+    def min_count(self) -> int:
+        """Upper bound on the count of any word not in the summary."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counts.values())
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Folds in the summary of another stream."""
+        floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for word in self.counts.keys() | other.counts.keys():
+            count, error = self.counts.get(word, (floor, floor))
+            other_count, other_error = other.counts.get(word, (other_floor, other_floor))
+            merged[word] = [count + other_count, error + other_error]
+
+        keep = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counts = dict(keep)
+        self.total += other.total
+        self._heap = [(c, w) for w, (c, _) in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """Most frequent words as (word, estimated count, maximum overestimate)."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1][0], reverse=True)
+        return [(word, count, error) for word, (count, error) in ranked[:n]]
+
+    def error_bound(self) -> float:
+        """Worst-case overestimate of any count: total / capacity."""
+        return self.total / self.capacity
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2 ** precision one-byte registers."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, words):
+        """Adds words; repeats do not change the estimate."""
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        registers = self.registers
+        for word in words:
+            h = _hash64(word)
+            index = h >> shift
+            rank = shift - (h & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Folds in the registers of another stream with the same precision."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precisions")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        """Estimated number of distinct words."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def relative_error(self) -> float:
+        """Standard error of the estimate relative to the true count."""
+        return 1.04 / math.sqrt(len(self.registers))
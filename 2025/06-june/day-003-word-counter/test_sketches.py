@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the word statistics sketches
+"""
+
+import random
+import unittest
+from collections import Counter
+from sketches import HyperLogLog, SpaceSaving
+
+
+def zipf_words(n, vocabulary, seed):
+    """Words with a skewed, Zipf-like frequency distribution."""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return [f"w{i}" for i in rng.choices(range(vocabulary), weights, k=n)]
+
+
+class TestSpaceSaving(unittest.TestCase):
+    
+    def test_exact_below_capacity(self):
+        """Test that counts are exact while every word fits."""
+        sketch = SpaceSaving(10)
+        sketch.update(Counter("a b a c a b".split()))
+        self.assertEqual(sketch.top(2), [('a', 3, 0), ('b', 2, 0)])
+        self.assertEqual(sketch.total, 6)
+    
+    def test_error_bounds_hold(self):
+        """Test that every estimate brackets the true count within its error."""
+        words = zipf_words(20000, 2000, seed=1)
+        truth = Counter(words)
+        sketch = SpaceSaving(100)
+        for start in range(0, len(words), 500):
+            sketch.update(Counter(words[start:start + 500]))
+        
+        for word, count, error in sketch.top(20):
+            self.assertLessEqual(count - error, truth[word])
+            self.assertGreaterEqual(count, truth[word])
+            self.assertLessEqual(error, sketch.error_bound())
+        # The heaviest words are found
+        self.assertEqual({w for w, _, _ in sketch.top(5)}, {w for w, _ in truth.most_common(5)})
+    
+    def test_merge(self):
+        """Test that merged shards still bracket the true counts."""
+        words = zipf_words(20000, 2000, seed=2)
+        shards = [SpaceSaving(100), SpaceSaving(100)]
+        shards[0].update(Counter(words[:10000]))
+        shards[1].update(Counter(words[10000:]))
+        merged = shards[0].merge(shards[1])
+        
+        truth = Counter(words)
+        self.assertEqual(merged.total, len(words))
+        self.assertLessEqual(len(merged.counts), 100)
+        for word, count, error in merged.top(20):
+            self.assertLessEqual(count - error, truth[word])
+            self.assertGreaterEqual(count, truth[word])
+
+
+class TestHyperLogLog(unittest.TestCase):
+    
+    def test_estimate_within_error(self):
+        """Test that the estimate is within a few standard errors."""
+        sketch = HyperLogLog(12)
+        sketch.update(f"word{i}" for i in range(50000))
+        sketch.update(f"word{i}" for i in range(1000))  # repeats change nothing
+        self.assertLess(abs(sketch.estimate() - 50000) / 50000, 4 * sketch.relative_error())
+    
+    def test_small_counts(self):
+        """Test that small cardinalities are nearly exact."""
+        sketch = HyperLogLog()
+        sketch.update(["a", "b", "c", "a"])
+        self.assertEqual(sketch.estimate(), 3)
+    
+    def test_merge_equals_union(self):
+        """Test that merging equals sketching the union of both streams."""
+        first, second, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+        first.update(str(i) for i in range(0, 3000))
+        second.update(str(i) for i in range(2000, 5000))
+        union.update(str(i) for i in range(0, 5000))
+        self.assertEqual(first.merge(second).registers, union.registers)
+        
+        with self.assertRaises(ValueError):
+            first.merge(HyperLogLog(11))
+
+
+if __name__ == '__main__':
+    print("Running sketch tests...")
+    unittest.main(verbosity=2)
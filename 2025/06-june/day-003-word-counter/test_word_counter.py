@@ -3,8 +3,18 @@
 Unit tests for the Word Counter Tool
 """
 
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
 import unittest
-from word_counter import WordCounter
+from unittest import mock
+from word_counter import (WordCounter, TextStats, IncrementalWordCounter, RecordWriter, analyze_batch,
+                          analyze_mmap, analyze_stream, analyze_stream_parallel,
+                          iter_corpus_files, iter_segments, write_corpus_report)
 
 
 class TestWordCounter(unittest.TestCase):
@@ -108,6 +118,30 @@ Every programmer knows that writing code is just the beginning of a long journey
         counter.set_text("new longer text with more words")
         self.assertEqual(counter.word_count(), 6)
         
+    def test_lazy_structures(self):
+        """Test that derived structures are built on demand, once, and rebuilt on change."""
+        counter = WordCounter(self.complex_text)
+        with mock.patch.object(counter, '_extract_words', wraps=counter._extract_words) as words, \
+                mock.patch.object(TextStats, 'feed', autospec=True, side_effect=TextStats.feed) as feed:
+            self.assertEqual(counter.character_count(True), len(self.complex_text))
+            self.assertEqual(counter.line_count(), 5)
+            self.assertEqual((words.call_count, feed.call_count), (0, 0),
+                             "Cheap queries should not tokenize the text")
+            
+            self.assertEqual(counter.word_count(), 32)
+            self.assertEqual(counter.paragraph_count(), 3)
+            self.assertEqual((words.call_count, feed.call_count), (0, 1),
+                             "Counts should share one pass and not build the word list")
+            self.assertEqual(len(counter.words), 32)
+            self.assertEqual(len(counter.words), 32)
+            self.assertEqual(words.call_count, 1, "The word list should be built once")
+            
+            counter.text = "Replaced text."
+            self.assertEqual(counter.word_count(), 2)
+            self.assertEqual(counter.words, ['replaced', 'text'])
+            self.assertEqual((words.call_count, feed.call_count), (2, 2),
+                             "A new text should be analyzed again")
+        
     def test_comprehensive_stats(self):
         """Test comprehensive statistics dictionary."""
         counter = WordCounter(self.simple_text)
@@ -129,6 +163,349 @@ Every programmer knows that writing code is just the beginning of a long journey
         self.assertEqual(stats['sentences'], 2)
 
 
+class TestStreamingAnalysis(unittest.TestCase):
+    
+    def setUp(self):
+        """Set up texts that stress chunk boundaries."""
+        self.texts = [
+            "Hello world! This is a test.",
+            """The Art of Programming
+
+Programming is both an art and a science. It requires creativity, logic, and persistence.
+
+
+Every programmer knows that writing code is just the beginning... Really?!""",
+            "  leading spaces\n\n\n\ntrailing newlines and ΣΊΣΥΦΟΣ café naïve.\n\n",
+            "nopunctuation",
+            "",
+        ]
+    
+    def assertMatchesWordCounter(self, text, stats):
+        """Streaming stats must equal the in-memory analysis of the same file."""
+        counter = WordCounter()
+        counter.set_text(text)
+        self.assertEqual(stats.get_comprehensive_stats(), counter.get_comprehensive_stats())
+        self.assertEqual(stats.word_frequency(50), counter.word_frequency(50))
+        self.assertEqual(stats.character_frequency(), counter.character_frequency())
+    
+    def test_matches_word_counter_for_any_chunk_size(self):
+        """Test that chunk size never changes the result."""
+        for text in self.texts:
+            for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+                with self.subTest(text=text[:20], chunk_size=chunk_size):
+                    self.assertMatchesWordCounter(text, analyze_stream(io.StringIO(text), chunk_size))
+    
+    def test_parallel_matches_serial(self):
+        """Test that the process pool gives the same result as a serial pass."""
+        text = "\n\n".join(self.texts) * 20
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                stats = analyze_stream_parallel(io.StringIO(text), workers, chunk_size=50)
+                self.assertMatchesWordCounter(text, stats)
+    
+    def test_approximate_mode(self):
+        """Test that sketched stats agree with exact ones on a small vocabulary."""
+        text = "\n\n".join(self.texts) * 20
+        exact = analyze_stream(io.StringIO(text))
+        approximate = analyze_stream_parallel(io.StringIO(text), 2, chunk_size=50,
+                                              sketch_capacity=100, hll_precision=12)
+        
+        stats = approximate.get_comprehensive_stats()
+        self.assertEqual(stats['unique_words'], exact.unique_word_count())
+        self.assertIn('unique_words_relative_error', stats)
+        self.assertEqual(dict(approximate.word_frequency(None)), dict(exact.word_frequency(None)))
+        self.assertEqual(stats['words'], exact.word_count())
+        with self.assertRaises(ValueError):
+            exact.merge(approximate)
+    
+    def test_segments_cover_text(self):
+        """Test that segments reassemble to the input and never split a word."""
+        text = self.texts[1]
+        segments = list(iter_segments(io.StringIO(text), 5))
+        self.assertEqual(''.join(segments), text)
+        for segment in segments[:-1]:
+            self.assertTrue(segment[-1].isspace())
+    
+    def test_merge_same_document(self):
+        """Test that stats of adjacent parts merge into the stats of the whole."""
+        text = self.texts[1]
+        segments = list(iter_segments(io.StringIO(text), 16))
+        middle = len(segments) // 2
+        
+        first, second = TextStats(), TextStats()
+        for segment in segments[:middle]:
+            first.feed(segment)
+        for segment in segments[middle:]:
+            second.feed(segment)
+        
+        self.assertMatchesWordCounter(text, first.merge(second))
+    
+    def test_merge_separate_documents(self):
+        """Test that sentences and lines never run across documents."""
+        first, second = TextStats(), TextStats()
+        first.feed("no terminator here\n")
+        second.feed("second document. ")
+        merged = first.merge(second, same_document=False)
+        
+        self.assertEqual(merged.sentence_count(), 2)
+        self.assertEqual(merged.paragraph_count(), 2)
+        self.assertEqual(merged.line_count(), 3)
+        self.assertEqual(merged.word_count(), 5)
+
+
+
+class TestMmapTokenizer(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'doc.txt')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def assertMatchesLoadFromFile(self, text, newline=None):
+        """Bytes-level stats must equal WordCounter.load_from_file for any window size."""
+        with open(self.path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(text)
+        counter = WordCounter()
+        self.assertTrue(counter.load_from_file(self.path))
+        for chunk_size in (1, 5, 1 << 20):
+            with self.subTest(text=text[:20], chunk_size=chunk_size):
+                stats = analyze_mmap(self.path, chunk_size)
+                self.assertEqual(stats.get_comprehensive_stats(), counter.get_comprehensive_stats())
+                self.assertEqual(stats.word_frequency(50), counter.word_frequency(50))
+                self.assertEqual(stats.character_frequency(), counter.character_frequency())
+    
+    def test_ascii(self):
+        """Test plain ASCII text with punctuation and blank lines."""
+        self.assertMatchesLoadFromFile("Hello world! This is a test.\n\nSecond paragraph, isn't it?\n")
+    
+    def test_utf8(self):
+        """Test multi-byte words, non-ASCII whitespace and a final sigma."""
+        self.assertMatchesLoadFromFile("Café naïve 中文\u00a0text — ΟΔΟΣ. ΟΔΟΣ'Α\u3000end!")
+    
+    def test_non_ascii_lowering_to_ascii(self):
+        """Test characters whose lowercase form is or contains ASCII, next to ASCII."""
+        self.assertMatchesLoadFromFile("\u212aelvin İstanbul KİLO ﬁne Straße STRASSE\n")
+    
+    def test_windows_line_endings(self):
+        """Test that CRLF is counted like the text-mode read of load_from_file."""
+        self.assertMatchesLoadFromFile("one\ntwo\n\nthree\n", newline='\r\n')
+    
+    def test_empty_file(self):
+        """Test that an empty file has one empty line, like load_from_file."""
+        self.assertMatchesLoadFromFile("")
+    
+    def test_invalid_utf8(self):
+        """Test that undecodable bytes raise like a text-mode read."""
+        with open(self.path, 'wb') as f:
+            f.write(b'valid \xff\xfe words')
+        with self.assertRaises(UnicodeDecodeError):
+            analyze_mmap(self.path)
+
+
+class TestIncrementalEdits(unittest.TestCase):
+    
+    def assertMatchesSetText(self, counter, text):
+        """Incrementally updated stats must equal a fresh analysis of the text."""
+        fresh = WordCounter()
+        fresh.set_text(text)
+        self.assertEqual(counter.text, text)
+        self.assertEqual(counter.get_comprehensive_stats(), fresh.get_comprehensive_stats())
+        self.assertEqual(dict(counter.word_frequency(None)), dict(fresh.word_frequency(None)))
+        self.assertEqual(counter.character_frequency(), fresh.character_frequency())
+    
+    def test_typing(self):
+        """Test inserting and deleting characters one keystroke at a time."""
+        text = "Hello world. Bye"
+        counter = IncrementalWordCounter(text)
+        for char in "!\n\nA new paragraph, longerwordhere.":
+            counter.apply_edit(len(text), 0, char)
+            text += char
+            self.assertMatchesSetText(counter, text)
+        while text:
+            counter.apply_edit(len(text) - 1, 1, "")
+            text = text[:-1]
+            self.assertMatchesSetText(counter, text)
+    
+    def test_extremes_follow_edits(self):
+        """Test that the first longest and shortest words are tracked across edits."""
+        counter = IncrementalWordCounter("a bb ccc bb dddd ccc")
+        self.assertEqual((counter.longest_word(), counter.shortest_word()), ("dddd", "a"))
+        counter.apply_edit(12, 5, "")  # remove "dddd "
+        self.assertEqual(counter.longest_word(), "ccc")
+        counter.apply_edit(0, 2, "")   # remove "a "
+        self.assertEqual(counter.shortest_word(), "bb")
+        self.assertMatchesSetText(counter, "bb ccc bb ccc")
+    
+    def test_random_edits(self):
+        """Test random replacements against a full re-analysis."""
+        rng = random.Random(3)
+        pieces = ["word", "Σ", "ΟΣ", " ", "\n", "\n\n", ".", "!?", "'", "-", "longer", "\u00a0"]
+        text = "".join(rng.choice(pieces) for _ in range(40))
+        counter = IncrementalWordCounter(text)
+        for _ in range(300):
+            offset = rng.randint(0, len(text))
+            deleted = rng.randint(0, min(5, len(text) - offset))
+            inserted = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+            counter.apply_edit(offset, deleted, inserted)
+            text = text[:offset] + inserted + text[offset + deleted:]
+            self.assertMatchesSetText(counter, text)
+    
+    def test_edit_outside_text(self):
+        """Test that an edit beyond the end of the text is rejected."""
+        counter = IncrementalWordCounter("short")
+        with self.assertRaises(ValueError):
+            counter.apply_edit(3, 5, "")
+
+
+class TestCorpusMode(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a small directory tree of documents."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.texts = {
+            'a.txt': "Hello world! This is a test.",
+            os.path.join('sub', 'b.txt'): "Another document\n\nwith two paragraphs.",
+            os.path.join('sub', 'deeper', 'c.txt'): "Third one. Short.",
+            os.path.join('sub', 'notes.md'): "Markdown is skipped by the pattern.",
+        }
+        for name, text in self.texts.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_iter_corpus_files(self):
+        """Test that directories are walked recursively and filtered by pattern."""
+        files = list(iter_corpus_files([self.root], '*.txt'))
+        expected = sorted(os.path.join(self.root, n) for n in self.texts if n.endswith('.txt'))
+        self.assertEqual(sorted(files), expected)
+        
+        pattern = os.path.join(self.root, '**', '*.md')
+        self.assertEqual(list(iter_corpus_files([pattern, pattern])),
+                         [os.path.join(self.root, 'sub', 'notes.md')])
+    
+    def test_report_per_file_and_aggregate(self):
+        """Test that each file gets its own stats line followed by the aggregate."""
+        missing = os.path.join(self.root, 'missing.txt')
+        out = io.StringIO()
+        write_corpus_report([self.root, missing], out, '*.txt', readers=2)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        
+        by_path = {r['path']: r for r in records[:-1]}
+        self.assertEqual(len(by_path), 4)
+        self.assertIn('error', by_path[missing])
+        for name, text in self.texts.items():
+            if name.endswith('.txt'):
+                record = dict(by_path[os.path.join(self.root, name)])
+                del record['path']
+                self.assertEqual(record, WordCounter(text).get_comprehensive_stats())
+        
+        aggregate = records[-1]
+        self.assertTrue(aggregate['aggregate'])
+        self.assertEqual(aggregate['files'], 3)
+        self.assertEqual(aggregate['errors'], 1)
+        self.assertEqual(aggregate['words'], 6 + 5 + 3)
+        self.assertEqual(aggregate['sentences'], 2 + 1 + 2)
+        self.assertEqual(aggregate['lines'], 1 + 3 + 1)
+    
+    def test_report_mmap_and_top_words(self):
+        """Test that corpus mode can memory-map files and add each one's top words."""
+        out = io.StringIO()
+        write_corpus_report([self.root], out, '*.txt', readers=2, top_words=2, memory_map=True)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        for name, text in self.texts.items():
+            if name.endswith('.txt'):
+                record = next(r for r in records if r['path'] == os.path.join(self.root, name))
+                self.assertEqual(record['top_words'], dict(WordCounter(text).word_frequency(2)))
+        self.assertEqual(records[-1]['words'], 6 + 5 + 3)
+        self.assertEqual(len(records[-1]['top_words']), 2)
+    
+    def test_report_approximate(self):
+        """Test that sketch settings reach every file and the aggregate."""
+        out = io.StringIO()
+        total = write_corpus_report([self.root], out, '*.txt', readers=2, sketch_capacity=4)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertTrue(total.approximate)
+        self.assertEqual(len(records), 4)
+        for record in records:
+            self.assertIn('unique_words_relative_error', record)
+        self.assertEqual(records[-1]['words'], 6 + 5 + 3)
+
+
+
+class TestMachineReadableOutput(unittest.TestCase):
+    
+    def setUp(self):
+        self.texts = ["Hello world! This is a test.", "", "One.\n\nTwo words?", "Ünïcode wörds ok"]
+    
+    def test_batch_matches_word_counter(self):
+        """Test that batch stats equal per-text WordCounter stats, in order."""
+        expected = []
+        for text in self.texts:
+            counter = WordCounter()
+            counter.set_text(text)
+            expected.append(counter.get_comprehensive_stats())
+        
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                stats = analyze_batch(iter(self.texts * 3), workers, batch_size=2)
+                self.assertEqual([s.get_comprehensive_stats() for s in stats], expected * 3)
+    
+    def test_batch_approximate(self):
+        """Test that every batch text gets its own sketches."""
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                stats = list(analyze_batch(self.texts, workers, batch_size=2, sketch_capacity=4))
+                self.assertTrue(all(s.approximate for s in stats))
+                self.assertEqual([s.word_count() for s in stats], [6, 0, 3, 3])
+    
+    def test_record_writer_formats(self):
+        """Test NDJSON, CSV and JSON output of the same records."""
+        records = [{'words': 2, 'longest_word': 'hello', 'top_words': {'a': 2, 'b': 1}},
+                   {'words': 0, 'longest_word': ''}]
+        fields = ['words', 'longest_word', 'top_words']
+        
+        outputs = {}
+        for output_format in ('ndjson', 'csv', 'json'):
+            out = io.StringIO()
+            writer = RecordWriter(out, output_format, fields)
+            for record in records:
+                writer.write(record)
+            writer.close()
+            outputs[output_format] = out.getvalue()
+        
+        self.assertEqual([json.loads(line) for line in outputs['ndjson'].splitlines()], records)
+        self.assertEqual(json.loads(outputs['json']), records)
+        self.assertEqual(outputs['csv'].splitlines(),
+                         ['words,longest_word,top_words', '2,hello,a:2 b:1', '0,,'])
+    
+    def test_cli_rejects_unsupported_mmap(self):
+        """Test that --mmap without an input file is refused instead of ignored."""
+        for args in (['--mmap'], ['--mmap', '--batch']):
+            with self.subTest(args=args):
+                result = subprocess.run(
+                    [sys.executable, 'word_counter.py', *args], input="Some text.",
+                    capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+                self.assertEqual(result.returncode, 2)
+                self.assertIn('--mmap', result.stderr)
+    
+    def test_cli_json(self):
+        """Test that the CLI prints nothing but the JSON document."""
+        result = subprocess.run(
+            [sys.executable, 'word_counter.py', '--format', 'json', '--frequency', '--top', '2'],
+            input="The cat and the hat.", capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        record = json.loads(result.stdout)
+        self.assertEqual(record['words'], 5)
+        self.assertEqual(record['top_words'], {'the': 2, 'cat': 1})
+
+
 if __name__ == '__main__':
     print("Running Word Counter tests...")
     unittest.main(verbosity=2)
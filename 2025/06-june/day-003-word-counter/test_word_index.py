@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the persistent word index
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from word_counter import WordCounter
+from word_index import WordIndex
+
+
+class TestWordIndex(unittest.TestCase):
+    
+    def setUp(self):
+        """Create a document set and an empty index."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, 'docs')
+        os.makedirs(self.docs)
+        self.write('a.txt', "The cat sat. The cat ran!")
+        self.write('b.txt', "A dog and the cat.")
+        self.index = WordIndex(os.path.join(self.tmp.name, 'index.db'))
+    
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+    
+    def write(self, name, text):
+        path = os.path.join(self.docs, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+    
+    def test_queries(self):
+        """Test top words, word frequency and documents containing a word."""
+        report = self.index.update([self.docs])
+        self.assertEqual(report['added'], 2)
+        
+        self.assertEqual(self.index.top_words(2), [('cat', 3, 2), ('the', 3, 2)])
+        self.assertEqual(self.index.frequency('Dog'), (1, 1))
+        self.assertEqual(self.index.frequency('missing'), (0, 0))
+        self.assertEqual(self.index.documents_containing('cat'),
+                         [(os.path.join(self.docs, 'a.txt'), 2), (os.path.join(self.docs, 'b.txt'), 1)])
+        
+        path = os.path.join(self.docs, 'b.txt')
+        self.assertEqual(self.index.document_stats(path),
+                         WordCounter("A dog and the cat.").get_comprehensive_stats())
+    
+    def test_incremental_update(self):
+        """Test that only changed files are re-analyzed and totals follow edits."""
+        self.index.update([self.docs])
+        self.assertEqual(self.index.update([self.docs])['unchanged'], 2)
+        
+        # Same content with a new mtime only refreshes the mtime
+        path = os.path.join(self.docs, 'a.txt')
+        later = time.time() + 10
+        os.utime(path, (later, later))
+        report = self.index.update([self.docs])
+        self.assertEqual((report['updated'], report['unchanged']), (0, 2))
+        
+        self.write('a.txt', "No felines here.")
+        report = self.index.update([self.docs])
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(self.index.frequency('cat'), (1, 1))
+        self.assertEqual(self.index.frequency('felines'), (1, 1))
+    
+    def test_prune_removed_files(self):
+        """Test that deleted files leave the index and its totals when pruning."""
+        self.index.update([self.docs])
+        os.remove(os.path.join(self.docs, 'b.txt'))
+        
+        report = self.index.update([self.docs], prune=True)
+        self.assertEqual(report['removed'], 1)
+        self.assertEqual(self.index.document_count(), 1)
+        self.assertEqual(self.index.frequency('dog'), (0, 0))
+        self.assertEqual(self.index.frequency('cat'), (2, 1))
+
+
+if __name__ == '__main__':
+    print("Running Word Index tests...")
+    unittest.main(verbosity=2)
@@ -13,19 +13,71 @@ import os
 import sys
 import re
 import argparse
-from collections import Counter, defaultdict
+import copy
+import csv
+import fnmatch
+import glob
+import itertools
+import json
+import mmap
+from collections import Counter, defaultdict, deque
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait)
 from typing import Dict, List, Tuple
 import string
 
+from sketches import DEFAULT_CAPACITY, DEFAULT_PRECISION, HyperLogLog, SpaceSaving
+
 
 class WordCounter:
-    """A comprehensive text analysis tool."""
+    """A comprehensive text analysis tool.
+    
+    Lines, words and sentences are built on first access and cached until the
+    text changes. The statistics themselves come from a single TextStats.feed()
+    of the text, also cached, so cheap queries never pay for it.
+    """
     
     def __init__(self, text: str = ""):
+        # An empty constructor text has no lines; an empty loaded text has one
+        self._empty_has_line = False
         self.text = text
-        self.lines = text.split('\n') if text else []
-        self.words = self._extract_words(text) if text else []
-        self.sentences = self._extract_sentences(text) if text else []
+    
+    @property
+    def text(self) -> str:
+        return self._text
+    
+    @text.setter
+    def text(self, text: str):
+        self._text = text
+        self._cache = {}
+    
+    def _cached(self, name: str, build):
+        """Return a derived value, building it on first access."""
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+    
+    @property
+    def lines(self) -> List[str]:
+        return self._cached('lines', lambda: self.text.split('\n')
+                            if self.text or self._empty_has_line else [])
+    
+    @property
+    def words(self) -> List[str]:
+        return self._cached('words', lambda: self._extract_words(self.text))
+    
+    @property
+    def sentences(self) -> List[str]:
+        return self._cached('sentences', lambda: self._extract_sentences(self.text))
+    
+    def _stats(self) -> 'TextStats':
+        """All statistics of the text, gathered by one TextStats.feed()."""
+        def build():
+            stats = TextStats()
+            stats.feed(self.text)
+            stats.documents = 1 if self.text or self._empty_has_line else 0
+            return stats
+        return self._cached('stats', build)
     
     def _extract_words(self, text: str) -> List[str]:
         """Extract words from text, removing punctuation."""
@@ -43,10 +95,8 @@ class WordCounter:
         """Load text from a file."""
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                self.text = f.read()
-            self.lines = self.text.split('\n')
-            self.words = self._extract_words(self.text)
-            self.sentences = self._extract_sentences(self.text)
+                text = f.read()
+            self.set_text(text)
             return True
         except Exception as e:
             print(f"❌ Error reading file: {e}")
@@ -54,64 +104,58 @@ class WordCounter:
     
     def set_text(self, text: str):
         """Set new text to analyze."""
+        self._empty_has_line = True
         self.text = text
-        self.lines = text.split('\n')
-        self.words = self._extract_words(text)
-        self.sentences = self._extract_sentences(text)
     
     def character_count(self, include_spaces: bool = True) -> int:
         """Count characters in text."""
         if include_spaces:
             return len(self.text)
-        else:
-            return len(re.sub(r'\s', '', self.text))
+        if 'stats' in self._cache:
+            return self._cache['stats'].character_count(False)
+        return len(re.sub(r'\s', '', self.text))
     
     def word_count(self) -> int:
         """Count total words in text."""
-        return len(self.words)
+        return self._stats().word_count()
     
     def line_count(self) -> int:
         """Count lines in text."""
-        return len(self.lines)
+        if not self.text and not self._empty_has_line:
+            return 0
+        return self.text.count('\n') + 1
     
     def sentence_count(self) -> int:
         """Count sentences in text."""
-        return len(self.sentences)
+        return self._stats().sentence_count()
     
     def paragraph_count(self) -> int:
         """Count paragraphs (separated by empty lines)."""
-        paragraphs = self.text.split('\n\n')
-        return len([p for p in paragraphs if p.strip()])
+        return self._stats().paragraph_count()
     
     def word_frequency(self, top_n: int = 10) -> List[Tuple[str, int]]:
         """Get most frequent words."""
-        counter = Counter(self.words)
-        return counter.most_common(top_n)
+        return self._stats().word_frequency(top_n)
     
     def unique_word_count(self) -> int:
         """Count unique words."""
-        return len(set(self.words))
+        return self._stats().unique_word_count()
     
     def average_word_length(self) -> float:
         """Calculate average word length."""
-        if not self.words:
-            return 0.0
-        return sum(len(word) for word in self.words) / len(self.words)
+        return self._stats().average_word_length()
     
     def average_sentence_length(self) -> float:
         """Calculate average sentence length in words."""
-        if not self.sentences:
-            return 0.0
-        total_words = sum(len(self._extract_words(sentence)) for sentence in self.sentences)
-        return total_words / len(self.sentences)
+        return self._stats().average_sentence_length()
     
     def longest_word(self) -> str:
         """Find the longest word."""
-        return max(self.words, key=len) if self.words else ""
+        return self._stats().longest_word()
     
     def shortest_word(self) -> str:
         """Find the shortest word."""
-        return min(self.words, key=len) if self.words else ""
+        return self._stats().shortest_word()
     
     def reading_time(self, wpm: int = 200) -> float:
         """Estimate reading time in minutes (default 200 words per minute)."""
@@ -119,12 +163,368 @@ class WordCounter:
     
     def character_frequency(self) -> Dict[str, int]:
         """Get character frequency (excluding spaces)."""
-        text_no_spaces = re.sub(r'\s', '', self.text.lower())
-        return dict(Counter(text_no_spaces))
+        return self._stats().character_frequency()
     
     def get_comprehensive_stats(self) -> Dict:
         """Get all statistics in one dictionary."""
-        return {
+        return self._stats().get_comprehensive_stats()
+
+
+# Default number of characters read per chunk in streaming mode (1 MiB of ASCII)
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Files read concurrently in corpus mode
+DEFAULT_READERS = 8
+
+WORD_RE = re.compile(r'\w+')
+SENTENCE_END_RE = re.compile(r'[.!?]+')
+WHITESPACE_RE = re.compile(r'\s')
+NON_SPACE_RE = re.compile(r'\S+')
+
+# Bytes-level tokenizer for UTF-8 files. A raw token is a run of ASCII word
+# characters, non-ASCII bytes and the ASCII characters lower() treats as
+# case-ignorable around a final sigma; every \\w+ run of the decoded text lies
+# inside one raw token, so only distinct raw tokens ever need decoding.
+ASCII_WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+RAW_TOKEN_RE = re.compile(rb"(?:[0-9A-Za-z_'.:^`]|[\x80-\xff])+")
+SENTENCE_END_BYTES_RE = re.compile(rb'[.!?]+')
+# ASCII whitespace followed by the first byte of something that is not ASCII whitespace
+BYTE_CUT_RE = re.compile(rb'[ \t\n\r\x0b\x0c\x1c-\x1f](?=[^ \t\n\r\x0b\x0c\x1c-\x1f\x80-\xbf])')
+# Byte value -> (character, whether it can only occur outside raw tokens) for
+# every ASCII character that is neither whitespace nor uppercase
+_ASCII_CHARS = {b: (chr(b), not RAW_TOKEN_RE.match(bytes([b])))
+                for b in range(128) if b not in ASCII_WHITESPACE and not chr(b).isupper()}
+
+
+def _token_info(raw: bytes) -> tuple:
+    """Length, non-space length, words and character counts of a non-ASCII raw token.
+
+    ASCII characters are left out of the character counts: feed_bytes counts
+    those on the whole segment at once.
+    """
+    text = raw.decode('utf-8')
+    lowered = text.lower()
+    chars = Counter(WHITESPACE_RE.sub('', lowered))
+    # ASCII lowers to itself, one for one, whatever surrounds it
+    chars.subtract(char.lower() for char in text if char.isascii())
+    return (len(text), len(WHITESPACE_RE.sub('', text)), WORD_RE.findall(lowered),
+            [(char, count) for char, count in chars.items() if count])
+
+
+def _is_blank_bytes(piece: bytes) -> bool:
+    """Whether UTF-8 bytes decode to whitespace only."""
+    rest = piece.strip(ASCII_WHITESPACE)
+    if not rest:
+        return True
+    if rest.isascii():
+        return False
+    return rest.decode('utf-8').isspace()
+
+
+class _Pieces:
+    """Counts non-blank pieces of a text split on a separator, one segment at a time.
+
+    Only the blankness of the first and last open piece is kept, so two
+    states for adjacent parts of a text can be merged exactly.
+    """
+
+    def __init__(self):
+        self.split = False    # seen at least one separator
+        self.leading = False  # first piece (before any separator) is non-blank
+        self.closed = 0       # non-blank pieces strictly between separators
+        self.trailing = False # last, still open piece is non-blank
+
+    def feed(self, pieces: List[str], is_blank=str.isspace):
+        """Adds the pieces of the next segment, as returned by a split."""
+        other = _Pieces()
+        other.split = len(pieces) > 1
+        other.leading = bool(pieces[0]) and not is_blank(pieces[0])
+        other.closed = sum(1 for p in pieces[1:-1] if p and not is_blank(p))
+        last = pieces[-1]
+        other.trailing = (bool(last) and not is_blank(last)) if other.split else other.leading
+        self.merge(other)
+
+    def merge(self, other: '_Pieces'):
+        """Appends the state of the text that directly follows this one."""
+        if not other.split:
+            self.trailing = self.trailing or other.leading
+            if not self.split:
+                self.leading = self.trailing
+            return
+
+        joined = self.trailing or other.leading
+        if self.split:
+            self.closed += joined + other.closed
+        else:
+            self.leading = joined
+            self.closed += other.closed
+        self.split = True
+        self.trailing = other.trailing
+
+    def count(self) -> int:
+        """Total non-blank pieces."""
+        if not self.split:
+            return int(self.leading)
+        return int(self.leading) + self.closed + int(self.trailing)
+
+
+class TextStats:
+    """Single-pass, mergeable text statistics with the query API of WordCounter.
+
+    Text is fed in segments; memory grows with the vocabulary, not with the
+    size of the text. Segments must be cut where whitespace is followed by
+    non-whitespace (see iter_segments), so that no word, sentence terminator
+    or blank line is split between two segments.
+
+    With sketch_capacity set, word frequencies and the unique word count are
+    kept in fixed-size SpaceSaving and HyperLogLog sketches instead of an
+    exact Counter, so memory no longer grows with the vocabulary.
+    """
+
+    def __init__(self, sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION):
+        self.documents = 0
+        self.characters = 0
+        self.non_space_characters = 0
+        self.newlines = 0
+        self.words = Counter() if sketch_capacity is None else None
+        self.heavy_hitters = SpaceSaving(sketch_capacity) if sketch_capacity is not None else None
+        self.distinct_words = HyperLogLog(hll_precision) if sketch_capacity is not None else None
+        self.total_words = 0
+        self.total_word_length = 0
+        self.longest = ""
+        self.shortest = ""
+        self.char_counts = Counter()
+        self._sentences = _Pieces()
+        self._paragraphs = _Pieces()
+
+    def feed(self, segment: str):
+        """Adds the next segment of the current document.
+
+        The segment is lowercased once and then scanned four times: one
+        character count, one word scan, and one split each for sentences and
+        paragraphs. No list of lines or sentences is kept.
+        """
+        if not self.documents:
+            self.documents = 1
+        if not segment:
+            return
+
+        # One character count of the lowered text serves the character
+        # frequency, the whitespace and the newline counts: lower() never
+        # turns whitespace into anything else or anything else into whitespace
+        lowered = segment.lower()
+        chars = Counter(lowered)
+        spaces = [char for char in chars if char.isspace()]
+        self.characters += len(segment)
+        self.non_space_characters += len(segment) - sum(chars[char] for char in spaces)
+        self.newlines += chars['\n']
+        for char in spaces:
+            del chars[char]
+        self.char_counts.update(chars)
+
+        words = WORD_RE.findall(lowered)
+        self._count_words(words)
+        self.total_words += len(words)
+        if words:
+            self.total_word_length += sum(map(len, words))
+            # Strict comparisons keep the first word of a given length, like max()/min()
+            longest = max(words, key=len)
+            if len(longest) > len(self.longest):
+                self.longest = longest
+            shortest = min(words, key=len)
+            if not self.shortest or len(shortest) < len(self.shortest):
+                self.shortest = shortest
+
+        self._sentences.feed(SENTENCE_END_RE.split(segment))
+        self._paragraphs.feed(segment.split('\n\n'))
+
+    def feed_bytes(self, segment: bytes, interned: Dict[bytes, tuple] = None):
+        """Adds the next segment of the current document as UTF-8 bytes.
+
+        Same result as feed(segment.decode()), but the segment is never
+        decoded as a whole: raw tokens are counted on the ASCII-lowercased
+        bytes, ASCII tokens are split into words as they are, and the others
+        are decoded only once per interned table shared by calls. Line
+        endings must already be normalized to '\\n'.
+        """
+        if not self.documents:
+            self.documents = 1
+        if not segment:
+            return
+        if interned is None:
+            interned = {}
+
+        # bytes.lower() only folds ASCII, which lower() folds the same way
+        # whatever surrounds it, so a lowered token decodes and lowers to the
+        # same text as the original one
+        lowered = segment.lower()
+        tokens = Counter(RAW_TOKEN_RE.findall(lowered))
+        segment_words = Counter()
+        token_bytes = 0
+        for raw, n in tokens.items():
+            token_bytes += len(raw) * n
+            if raw.isascii():
+                words = WORD_RE.findall(raw.decode('ascii'))
+                self.characters += len(raw) * n
+                self.non_space_characters += len(raw) * n
+            else:
+                info = interned.get(raw)
+                if info is None:
+                    info = interned[raw] = _token_info(raw)
+                length, non_space, words, chars = info
+                self.characters += length * n
+                self.non_space_characters += non_space * n
+                for char, count in chars:
+                    self.char_counts[char] += count * n
+            for word in words:
+                segment_words[word] += n
+                self.total_words += n
+                self.total_word_length += len(word) * n
+                if len(word) > len(self.longest):
+                    self.longest = word
+                if not self.shortest or len(word) < len(self.shortest):
+                    self.shortest = word
+
+        self._count_words(segment_words)
+
+        # Everything outside the raw tokens is ASCII: one byte per character
+        self.characters += len(segment) - token_bytes
+        # ASCII characters, inside tokens or not, counted for the bytes present
+        for byte in set(lowered):
+            entry = _ASCII_CHARS.get(byte)
+            if entry:
+                char, outside = entry
+                count = lowered.count(byte)
+                if outside:
+                    self.non_space_characters += count
+                self.char_counts[char] += count
+        self.newlines += segment.count(b'\n')
+
+        self._sentences.feed(SENTENCE_END_BYTES_RE.split(segment), _is_blank_bytes)
+        self._paragraphs.feed(segment.split(b'\n\n'), _is_blank_bytes)
+
+    @property
+    def approximate(self) -> bool:
+        """Whether word frequencies and unique words come from sketches."""
+        return self.words is None
+
+    def _count_words(self, words):
+        """Adds words, given as a list or as a Counter of occurrences."""
+        if self.words is not None:
+            self.words.update(words)
+            return
+        counts = words if isinstance(words, Counter) else Counter(words)
+        self.heavy_hitters.update(counts)
+        self.distinct_words.update(counts)
+
+    def merge(self, other: 'TextStats', same_document: bool = True):
+        """Folds in the stats of the text that follows this one.
+
+        With same_document=True the two texts are treated as adjacent parts
+        of one document split at a safe boundary; otherwise as separate
+        documents, so sentences, paragraphs and lines never run across them.
+        """
+        if self.approximate != other.approximate:
+            raise ValueError("Cannot merge exact and approximate stats")
+        if not self.documents:
+            self.documents = other.documents
+            self._sentences = copy.copy(other._sentences)
+            self._paragraphs = copy.copy(other._paragraphs)
+        elif same_document and other.documents:
+            self.documents += other.documents - 1
+            self._sentences.merge(other._sentences)
+            self._paragraphs.merge(other._paragraphs)
+        elif other.documents:
+            self.documents += other.documents
+            for mine, theirs in ((self._sentences, other._sentences),
+                                 (self._paragraphs, other._paragraphs)):
+                mine.closed = mine.count() + theirs.count()
+                mine.split, mine.leading, mine.trailing = True, False, False
+
+        self.characters += other.characters
+        self.non_space_characters += other.non_space_characters
+        self.newlines += other.newlines
+        if self.approximate:
+            self.heavy_hitters.merge(other.heavy_hitters)
+            self.distinct_words.merge(other.distinct_words)
+        else:
+            self.words.update(other.words)
+        self.total_words += other.total_words
+        self.total_word_length += other.total_word_length
+        self.char_counts.update(other.char_counts)
+        if len(other.longest) > len(self.longest):
+            self.longest = other.longest
+        if other.shortest and (not self.shortest or len(other.shortest) < len(self.shortest)):
+            self.shortest = other.shortest
+        return self
+
+    def character_count(self, include_spaces: bool = True) -> int:
+        """Count characters in text."""
+        return self.characters if include_spaces else self.non_space_characters
+
+    def word_count(self) -> int:
+        """Count total words in text."""
+        return self.total_words
+
+    def line_count(self) -> int:
+        """Count lines in text."""
+        return self.newlines + self.documents
+
+    def sentence_count(self) -> int:
+        """Count sentences in text."""
+        return self._sentences.count()
+
+    def paragraph_count(self) -> int:
+        """Count paragraphs (separated by empty lines)."""
+        return self._paragraphs.count()
+
+    def word_frequency(self, top_n: int = 10) -> List[Tuple[str, int]]:
+        """Get most frequent words."""
+        if self.approximate:
+            return [(word, count) for word, count, _ in self.heavy_hitters.top(top_n)]
+        return self.words.most_common(top_n)
+
+    def word_frequency_bounds(self, top_n: int = 10) -> List[Tuple[str, int, int]]:
+        """Get most frequent words as (word, count, maximum overestimate of count)."""
+        if self.approximate:
+            return self.heavy_hitters.top(top_n)
+        return [(word, count, 0) for word, count in self.words.most_common(top_n)]
+
+    def unique_word_count(self) -> int:
+        """Count unique words."""
+        if self.approximate:
+            return self.distinct_words.estimate()
+        return len(self.words)
+
+    def average_word_length(self) -> float:
+        """Calculate average word length."""
+        return self.total_word_length / self.total_words if self.total_words else 0.0
+
+    def average_sentence_length(self) -> float:
+        """Calculate average sentence length in words."""
+        # Terminators are never part of a word, so every word is in exactly one sentence
+        sentences = self.sentence_count()
+        return self.total_words / sentences if sentences else 0.0
+
+    def longest_word(self) -> str:
+        """Find the longest word."""
+        return self.longest
+
+    def shortest_word(self) -> str:
+        """Find the shortest word."""
+        return self.shortest
+
+    def reading_time(self, wpm: int = 200) -> float:
+        """Estimate reading time in minutes (default 200 words per minute)."""
+        return self.word_count() / wpm
+
+    def character_frequency(self) -> Dict[str, int]:
+        """Get character frequency (excluding spaces)."""
+        return dict(self.char_counts)
+
+    def get_comprehensive_stats(self) -> Dict:
+        """Get all statistics in one dictionary."""
+        stats = {
             'characters_with_spaces': self.character_count(True),
             'characters_without_spaces': self.character_count(False),
             'words': self.word_count(),
@@ -138,9 +538,530 @@ class WordCounter:
             'shortest_word': self.shortest_word(),
             'estimated_reading_time_minutes': round(self.reading_time(), 2)
         }
+        if self.approximate:
+            # Error bounds of the sketched values
+            stats['unique_words_relative_error'] = round(self.distinct_words.relative_error(), 4)
+            stats['word_frequency_max_error'] = round(self.heavy_hitters.error_bound(), 2)
+        return stats
+
+
+def _is_sentence_content(char: str) -> bool:
+    """Characters that make a sentence non-blank."""
+    return not char.isspace() and char not in '.!?'
+
+
+def _is_paragraph_content(char: str) -> bool:
+    """Characters that make a paragraph non-blank."""
+    return not char.isspace()
+
+
+def _piece_starts(text: str, left: int, right: int, split) -> int:
+    """Count the pieces that start at a content character in text[left + 1:right + 1].
+
+    left is the last content character before the range, or -1 when there is
+    none; a first piece that continues it does not start in the range.
+    """
+    pieces = split(text[left + 1:right + 1])
+    starts = sum(1 for p in pieces if p.strip())
+    if left >= 0 and pieces[0].strip():
+        starts -= 1
+    return starts
+
+
+class IncrementalWordCounter(TextStats):
+    """WordCounter statistics of an edited document, updated edit by edit.
+
+    apply_edit() re-tokenizes only the whitespace-delimited runs touched by
+    the edit and the gaps around it, so an edit costs about the size of the
+    edit instead of the size of the document. The only full scan left is
+    finding the next longest or shortest word after the only one of that
+    length is edited away. Words that are equally frequent may be listed by
+    word_frequency() in a different order than WordCounter would.
+    """
+
+    def __init__(self, text: str = ""):
+        super().__init__()
+        self.set_text(text)
+
+    def set_text(self, text: str):
+        """Set new text to analyze, from scratch."""
+        TextStats.__init__(self)
+        self.text = text
+        self.feed(text)
+        self.documents = 1
+        self._sentence_total = self._sentences.count()
+        self._paragraph_total = self._paragraphs.count()
+        self._lengths = Counter()
+        for word, count in self.words.items():
+            self._lengths[len(word)] += count
+        self._longest_at = self._first_word(len(self.longest), 0, len(text)) if self.longest else None
+        self._shortest_at = self._first_word(len(self.shortest), 0, len(text)) if self.shortest else None
+
+    def _first_word(self, length: int, start: int, end: int):
+        """Return (run start, index in run, word) of the first word of a length in text[start:end]."""
+        for match in NON_SPACE_RE.finditer(self.text, start, end):
+            for index, word in enumerate(WORD_RE.findall(match.group().lower())):
+                if len(word) == length:
+                    return match.start(), index, word
+        return None
+
+    def apply_edit(self, offset: int, deleted_len: int, inserted_text: str = ""):
+        """Replace text[offset:offset + deleted_len] with inserted_text and update all stats."""
+        old = self.text
+        end = offset + deleted_len
+        if offset < 0 or deleted_len < 0 or end > len(old):
+            raise ValueError(f"Edit ({offset}, {deleted_len}) is outside the text of length {len(old)}")
+        new = old[:offset] + inserted_text + old[end:]
+        shift = len(inserted_text) - deleted_len
+
+        # Sentence and paragraph starts only change between the content
+        # characters surrounding the edit
+        deltas = []
+        for is_content, split in ((_is_sentence_content, SENTENCE_END_RE.split),
+                                  (_is_paragraph_content, lambda t: t.split('\n\n'))):
+            left = offset - 1
+            while left >= 0 and not is_content(old[left]):
+                left -= 1
+            right = end
+            while right < len(old) and not is_content(old[right]):
+                right += 1
+            deltas.append(_piece_starts(new, left, right + shift, split)
+                          - _piece_starts(old, left, right, split))
+        self._sentence_total += deltas[0]
+        self._paragraph_total += deltas[1]
+
+        # Words and lowercased characters never span whitespace
+        start = offset
+        while start > 0 and not old[start - 1].isspace():
+            start -= 1
+        stop = end
+        while stop < len(old) and not old[stop].isspace():
+            stop += 1
+        old_lower = old[start:stop].lower()
+        new_lower = new[start:stop + shift].lower()
+        old_words = WORD_RE.findall(old_lower)
+        new_words = WORD_RE.findall(new_lower)
+
+        old_chars = WHITESPACE_RE.sub('', old_lower)
+        for counter, added, removed in ((self.words, new_words, old_words),
+                                        (self._lengths, map(len, new_words), map(len, old_words)),
+                                        (self.char_counts, WHITESPACE_RE.sub('', new_lower), old_chars)):
+            counter.update(added)
+            counter.subtract(removed)
+        for counter, removed in ((self.words, old_words),
+                                 (self._lengths, map(len, old_words)),
+                                 (self.char_counts, old_chars)):
+            for key in set(removed):
+                if counter[key] <= 0:
+                    del counter[key]
 
+        self.total_words += len(new_words) - len(old_words)
+        self.total_word_length += sum(map(len, new_words)) - sum(map(len, old_words))
+        deleted = old[offset:end]
+        self.characters += shift
+        self.non_space_characters += (len(WHITESPACE_RE.sub('', inserted_text))
+                                      - len(WHITESPACE_RE.sub('', deleted)))
+        self.newlines += inserted_text.count('\n') - deleted.count('\n')
+        self.text = new
 
-def print_analysis(counter: WordCounter, show_frequency: bool = False, top_words: int = 10):
+        self._longest_at = self._update_extreme(self._longest_at, max, start, stop, shift)
+        self._shortest_at = self._update_extreme(self._shortest_at, min, start, stop, shift)
+        self.longest = self._longest_at[2] if self._longest_at else ""
+        self.shortest = self._shortest_at[2] if self._shortest_at else ""
+
+    def _update_extreme(self, at, pick, start: int, stop: int, shift: int):
+        """Relocate the first longest (pick=max) or shortest (pick=min) word after an edit."""
+        if not self._lengths:
+            return None
+        length = pick(self._lengths)
+
+        in_edit = self._first_word(length, start, stop + shift)
+        if at is None or (len(at[2]) != length and pick(len(at[2]), length) == length):
+            # The extreme got more extreme, so only the edited runs can hold it
+            return in_edit
+        if len(at[2]) != length:
+            # The only word of the old extreme length is gone
+            return self._first_word(length, 0, len(self.text))
+
+        if at[0] >= stop:
+            at = (at[0] + shift, at[1], at[2])
+        elif at[0] >= start:
+            # The known first word was edited; nothing before it has this length
+            return in_edit or self._first_word(length, stop + shift, len(self.text))
+        return min(at, in_edit) if in_edit else at
+
+    def sentence_count(self) -> int:
+        """Count sentences in text."""
+        return self._sentence_total
+
+    def paragraph_count(self) -> int:
+        """Count paragraphs (separated by empty lines)."""
+        return self._paragraph_total
+
+
+def safe_cut(text: str) -> int:
+    """Return the last index where whitespace is followed by non-whitespace, or 0."""
+    end = len(text.rstrip())
+    cut = end
+    while cut > 0 and not text[cut - 1].isspace():
+        cut -= 1
+    return cut
+
+
+def iter_segments(stream, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield the text of a stream in chunks cut at safe boundaries."""
+    carry = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        text = carry + chunk
+        cut = safe_cut(text)
+        if cut:
+            yield text[:cut]
+        carry = text[cut:]
+    if carry:
+        yield carry
+
+
+def analyze_stream(stream, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze a text stream in one pass with memory bounded by the vocabulary.
+
+    With sketch_capacity set, memory is bounded by the sketch sizes instead.
+    """
+    stats = TextStats(sketch_capacity, hll_precision)
+    stats.documents = 1
+    for segment in iter_segments(stream, chunk_size):
+        stats.feed(segment)
+    return stats
+
+
+def analyze_file(filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze a file in streaming mode."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return analyze_stream(f, chunk_size, sketch_capacity, hll_precision)
+
+
+def _byte_cut(buf, start: int, end: int) -> int:
+    """Return the last index in (start, end) where buf can be cut safely, or start."""
+    tail = max(start, end - 4096)
+    while True:
+        for match in reversed(list(BYTE_CUT_RE.finditer(buf, tail, end))):
+            cut = match.end()
+            if buf[cut] < 0x80 or not buf[cut:cut + 4].decode('utf-8', 'ignore')[:1].isspace():
+                return cut
+        if tail == start:
+            return start
+        tail = max(start, tail - (end - tail))
+
+
+def analyze_mmap(filepath: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze a UTF-8 file through a memory map with the bytes-level tokenizer.
+
+    The file is never decoded or lowercased as a whole: it is scanned in
+    windows of about chunk_size bytes and only distinct tokens are decoded,
+    so peak memory is a window plus the vocabulary. Results match
+    WordCounter.load_from_file, including its universal newline handling.
+    """
+    stats = TextStats(sketch_capacity, hll_precision)
+    stats.documents = 1
+    interned = {}
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return stats
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = released = 0
+            while pos < size:
+                end = min(pos + chunk_size, size)
+                cut = end if end == size else _byte_cut(mm, pos, end)
+                while cut == pos:
+                    end = min(end + chunk_size, size)
+                    cut = end if end == size else _byte_cut(mm, pos, end)
+
+                segment = mm[pos:cut]
+                if b'\r' in segment:
+                    segment = segment.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+                stats.feed_bytes(segment, interned)
+                pos = cut
+                # Pages already scanned would otherwise stay resident until the end
+                done = pos - pos % mmap.PAGESIZE
+                if done > released and hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_DONTNEED, released, done - released)
+                    released = done
+    return stats
+
+
+def _analyze_segment(segment: str, sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Map step: statistics of one segment, run in a worker process."""
+    stats = TextStats(sketch_capacity, hll_precision)
+    stats.feed(segment)
+    return stats
+
+
+def analyze_stream_parallel(stream, workers: int = None,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze a text stream with a process pool, identical to the serial result.
+
+    Segments are tokenized and counted in parallel and the partial stats are
+    merged in input order. At most two segments per worker are in flight, so
+    memory stays bounded however large the stream is.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = TextStats(sketch_capacity, hll_precision)
+    stats.documents = 1
+    if workers == 1:
+        for segment in iter_segments(stream, chunk_size):
+            stats.feed(segment)
+        return stats
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for segment in iter_segments(stream, chunk_size):
+            pending.append(executor.submit(_analyze_segment, segment,
+                                           sketch_capacity, hll_precision))
+            if len(pending) >= workers * 2:
+                stats.merge(pending.popleft().result())
+        while pending:
+            stats.merge(pending.popleft().result())
+    return stats
+
+
+def analyze_file_parallel(filepath: str, workers: int = None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze a file with a process pool."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return analyze_stream_parallel(f, workers, chunk_size, sketch_capacity, hll_precision)
+
+
+def _is_pattern(path: str) -> bool:
+    """Whether a CLI input is a glob pattern rather than a plain path."""
+    return any(c in path for c in '*?[')
+
+
+def iter_corpus_files(inputs: List[str], pattern: str = '*'):
+    """Yield every file named by the inputs: files, directories (recursively) and globs.
+
+    Files inside directories are filtered by name with pattern and yielded in
+    sorted order; a file named more than once is yielded only once.
+    """
+    seen = set()
+    for item in inputs:
+        if _is_pattern(item):
+            candidates = sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+        elif os.path.isdir(item):
+            candidates = []
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                candidates.extend(os.path.join(root, name)
+                                  for name in sorted(files) if fnmatch.fnmatch(name, pattern))
+        else:
+            candidates = [item]
+
+        for path in candidates:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def analyze_corpus(files, readers: int = DEFAULT_READERS, processes: bool = False,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION,
+                   memory_map: bool = False):
+    """Analyze many files concurrently, yielding (index, path, stats, error) as each completes.
+
+    Files are read by a pool of reader threads, or of processes when
+    processes=True so that tokenizing uses several cores. At most two files
+    per reader are in flight. stats is None when the file could not be read,
+    and error then holds the reason. Each file goes through analyze_file, or
+    analyze_mmap when memory_map=True, with the given sketch settings.
+    """
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    analyze = analyze_mmap if memory_map else analyze_file
+    files = iter(enumerate(files))
+    pending = {}
+
+    def submit_next(executor):
+        for index, path in files:
+            future = executor.submit(analyze, path, chunk_size, sketch_capacity, hll_precision)
+            pending[future] = (index, path)
+            return
+
+    with executor_class(max_workers=readers) as executor:
+        for _ in range(readers * 2):
+            submit_next(executor)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, path = pending.pop(future)
+                try:
+                    yield index, path, future.result(), None
+                except (OSError, UnicodeDecodeError) as e:
+                    yield index, path, None, str(e)
+                submit_next(executor)
+
+
+# Output formats for machine-readable results
+OUTPUT_FORMATS = ['text', 'json', 'csv', 'ndjson']
+
+# Keys of get_comprehensive_stats(), in order
+STAT_FIELDS = [
+    'characters_with_spaces', 'characters_without_spaces', 'words', 'unique_words',
+    'lines', 'sentences', 'paragraphs', 'average_word_length', 'average_sentence_length',
+    'longest_word', 'shortest_word', 'estimated_reading_time_minutes',
+]
+
+
+class RecordWriter:
+    """Writes stats records as JSON, CSV or NDJSON.
+
+    NDJSON and CSV rows are written and flushed as they come, so consumers
+    can process results while the rest is still being analyzed; JSON
+    collects the records and close() writes them as one array, or as a
+    single object when there is exactly one. CSV columns are
+    fields in order; keys outside them are dropped, and dict values such as
+    top words become 'word:count' lists.
+    """
+
+    def __init__(self, out, output_format: str = 'ndjson', fields: List[str] = None):
+        if output_format not in ('json', 'csv', 'ndjson'):
+            raise ValueError(f"Unknown output format '{output_format}'")
+        self.out = out
+        self.output_format = output_format
+        self._records = []
+        self._csv = None
+        if output_format == 'csv':
+            self._csv = csv.DictWriter(out, fields or STAT_FIELDS, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, record: Dict):
+        """Write one record."""
+        if self.output_format == 'json':
+            self._records.append(record)
+            return
+        if self._csv is not None:
+            self._csv.writerow({k: ' '.join(f'{w}:{c}' for w, c in v.items()) if isinstance(v, dict) else v
+                                for k, v in record.items()})
+        else:
+            self.out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.out.flush()
+
+    def close(self):
+        """Finish the output; writes the collected JSON."""
+        if self.output_format == 'json':
+            json.dump(self._records if len(self._records) != 1 else self._records[0],
+                      self.out, ensure_ascii=False, indent=2)
+            self.out.write('\n')
+        self.out.flush()
+
+
+def analyze_text(text: str, sketch_capacity: int = None,
+                 hll_precision: int = DEFAULT_PRECISION) -> TextStats:
+    """Analyze one in-memory text; same results as WordCounter().set_text(text)."""
+    stats = TextStats(sketch_capacity, hll_precision)
+    stats.feed(text)
+    stats.documents = 1
+    return stats
+
+
+def _analyze_texts(texts: List[str], sketch_capacity: int = None,
+                   hll_precision: int = DEFAULT_PRECISION) -> List[TextStats]:
+    """Map step of analyze_batch: a whole batch per task keeps IPC overhead low."""
+    return [analyze_text(text, sketch_capacity, hll_precision) for text in texts]
+
+
+def analyze_batch(texts, workers: int = 1, batch_size: int = 256,
+                  sketch_capacity: int = None, hll_precision: int = DEFAULT_PRECISION):
+    """Analyze an iterable of texts, yielding one TextStats per text in order.
+
+    Every text goes through the same precompiled regexes and TextStats code
+    path with no per-document setup beyond an empty accumulator. With
+    workers > 1 (0 for every core), batches of batch_size texts are analyzed
+    in a process pool with at most two batches per worker in flight, so
+    millions of documents can be streamed through in one process. With
+    sketch_capacity set, every text gets its own fixed-size sketches.
+    """
+    workers = workers if workers != 0 else os.cpu_count() or 1
+    if workers == 1:
+        for text in texts:
+            yield analyze_text(text, sketch_capacity, hll_precision)
+        return
+
+    texts = iter(texts)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(itertools.islice(texts, batch_size))
+            if batch:
+                pending.append(executor.submit(_analyze_texts, batch, sketch_capacity, hll_precision))
+            if pending and (not batch or len(pending) >= workers * 2):
+                yield from pending.popleft().result()
+            if not batch and not pending:
+                return
+
+
+def batch_stats(texts, workers: int = 1, batch_size: int = 256) -> List[Dict]:
+    """Comprehensive stats of every text, as get_comprehensive_stats() dicts."""
+    return [stats.get_comprehensive_stats() for stats in analyze_batch(texts, workers, batch_size)]
+
+
+def write_corpus_report(inputs: List[str], out, pattern: str = '*',
+                        readers: int = DEFAULT_READERS, processes: bool = False,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        output_format: str = 'ndjson', sketch_capacity: int = None,
+                        hll_precision: int = DEFAULT_PRECISION, top_words: int = 0,
+                        memory_map: bool = False) -> TextStats:
+    """Write one record per file as it completes, then one for the whole corpus.
+
+    Per-file stats are merged into the aggregate in input order, whatever
+    order the files complete in, so the report is deterministic. In CSV the
+    aggregate is the last row, with an empty path. With sketch_capacity set,
+    every file and the aggregate use fixed-size sketches. With top_words set,
+    every record gets a top_words field with that many of its most frequent
+    words. memory_map is passed to analyze_corpus.
+    """
+    fields = ['path'] + STAT_FIELDS + (['top_words'] if top_words else [])
+    writer = RecordWriter(out, output_format, fields + ['error', 'aggregate', 'files', 'errors'])
+    total = TextStats(sketch_capacity, hll_precision)
+    waiting = {}
+    next_index = 0
+    files = errors = 0
+
+    for index, path, stats, error in analyze_corpus(iter_corpus_files(inputs, pattern),
+                                                    readers, processes, chunk_size,
+                                                    sketch_capacity, hll_precision, memory_map):
+        if error is None:
+            record = {'path': path, **stats.get_comprehensive_stats()}
+            if top_words:
+                record['top_words'] = dict(stats.word_frequency(top_words))
+        else:
+            record = {'path': path, 'error': error}
+            errors += 1
+        writer.write(record)
+
+        waiting[index] = stats
+        while next_index in waiting:
+            done = waiting.pop(next_index)
+            if done is not None:
+                total.merge(done, same_document=False)
+                files += 1
+            next_index += 1
+
+    aggregate = {'path': None, 'aggregate': True, 'files': files, 'errors': errors}
+    aggregate.update(total.get_comprehensive_stats())
+    if top_words:
+        aggregate['top_words'] = dict(total.word_frequency(top_words))
+    writer.write(aggregate)
+    writer.close()
+    return total
+
+
+def print_analysis(counter, show_frequency: bool = False, top_words: int = 10):
     """Print comprehensive text analysis."""
     stats = counter.get_comprehensive_stats()
     
@@ -152,7 +1073,11 @@ def print_analysis(counter: WordCounter, show_frequency: bool = False, top_words
     print(f"   Characters (with spaces):    {stats['characters_with_spaces']:,}")
     print(f"   Characters (without spaces): {stats['characters_without_spaces']:,}")
     print(f"   Words:                       {stats['words']:,}")
-    print(f"   Unique words:                {stats['unique_words']:,}")
+    if 'unique_words_relative_error' in stats:
+        print(f"   Unique words:                ~{stats['unique_words']:,} "
+              f"(±{stats['unique_words_relative_error']:.1%})")
+    else:
+        print(f"   Unique words:                {stats['unique_words']:,}")
     print(f"   Lines:                       {stats['lines']:,}")
     print(f"   Sentences:                   {stats['sentences']:,}")
     print(f"   Paragraphs:                  {stats['paragraphs']:,}")
@@ -169,9 +1094,14 @@ def print_analysis(counter: WordCounter, show_frequency: bool = False, top_words
     
     if show_frequency and counter.word_count() > 0:
         print(f"\n🔥 Top {top_words} Most Frequent Words:")
-        for i, (word, count) in enumerate(counter.word_frequency(top_words), 1):
-            percentage = (count / counter.word_count()) * 100
-            print(f"   {i:2d}. '{word}' - {count} times ({percentage:.1f}%)")
+        if getattr(counter, 'approximate', False):
+            for i, (word, count, error) in enumerate(counter.word_frequency_bounds(top_words), 1):
+                percentage = (count / counter.word_count()) * 100
+                print(f"   {i:2d}. '{word}' - ~{count} times, at most {error} too many ({percentage:.1f}%)")
+        else:
+            for i, (word, count) in enumerate(counter.word_frequency(top_words), 1):
+                percentage = (count / counter.word_count()) * 100
+                print(f"   {i:2d}. '{word}' - {count} times ({percentage:.1f}%)")
     
     print("\n" + "="*50)
 
@@ -182,8 +1112,9 @@ def main():
     )
     parser.add_argument(
         'input', 
-        nargs='?',
-        help='Input file path (if not provided, reads from stdin)'
+        nargs='*',
+        help='Input file path (if not provided, reads from stdin); several files, '
+             'directories or glob patterns switch to corpus mode'
     )
     parser.add_argument(
         '--frequency', '-f',
@@ -201,9 +1132,124 @@ def main():
         action='store_true',
         help='Interactive mode - enter text directly'
     )
+    parser.add_argument(
+        '--stream', '-s',
+        action='store_true',
+        help='Analyze in a single streaming pass without loading the whole text'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f'Characters read per chunk in streaming mode (default: {DEFAULT_CHUNK_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='Worker processes, implies --stream; 0 uses every core (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--approximate', '-a',
+        action='store_true',
+        help='Fixed-memory sketches for word frequencies and unique words, implies --stream'
+    )
+    parser.add_argument(
+        '--sketch-size',
+        type=int,
+        default=DEFAULT_CAPACITY,
+        help=f'Words tracked by the heavy-hitter sketch (default: {DEFAULT_CAPACITY})'
+    )
+    parser.add_argument(
+        '--hll-precision',
+        type=int,
+        default=DEFAULT_PRECISION,
+        help=f'HyperLogLog uses 2^P registers, 4-18 (default: {DEFAULT_PRECISION})'
+    )
+    parser.add_argument(
+        '--mmap',
+        action='store_true',
+        help='Memory-map the input file and tokenize its bytes directly'
+    )
+    parser.add_argument(
+        '--format',
+        dest='output_format',
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help='Output format (default: text, or ndjson in corpus and batch mode)'
+    )
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Treat every input line as a separate document and output one record per line'
+    )
+    parser.add_argument(
+        '--pattern',
+        default='*',
+        help="File name pattern for files inside directories in corpus mode (default: '*')"
+    )
+    parser.add_argument(
+        '--readers',
+        type=int,
+        default=DEFAULT_READERS,
+        help=f'Files read concurrently in corpus mode (default: {DEFAULT_READERS})'
+    )
     
     args = parser.parse_args()
     
+    if args.chunk_size <= 0:
+        print("❌ --chunk-size must be positive")
+        sys.exit(1)
+    if args.workers < 0:
+        print("❌ --workers must not be negative")
+        sys.exit(1)
+    if args.readers <= 0:
+        print("❌ --readers must be positive")
+        sys.exit(1)
+    if args.sketch_size <= 0:
+        print("❌ --sketch-size must be positive")
+        sys.exit(1)
+    if not 4 <= args.hll_precision <= 18:
+        print("❌ --hll-precision must be between 4 and 18")
+        sys.exit(1)
+    if args.workers != 1 or args.approximate:
+        args.stream = True
+    sketch = (args.sketch_size, args.hll_precision) if args.approximate else (None, DEFAULT_PRECISION)
+    
+    # Several inputs, a directory or a glob: one record per file
+    corpus = len(args.input) > 1 or any(os.path.isdir(p) or _is_pattern(p) for p in args.input)
+    if args.mmap and (args.batch or args.interactive or not args.input):
+        parser.error("--mmap needs input files; it cannot map stdin or --batch lines")
+    if args.mmap and not corpus and args.workers != 1:
+        parser.error("--mmap analyzes a single file in one process; --workers needs corpus mode")
+    if (corpus or args.batch) and args.output_format in (None, 'text'):
+        args.output_format = 'ndjson'
+    if corpus:
+        processes = args.workers != 1
+        readers = (args.workers or os.cpu_count() or 1) if processes else args.readers
+        write_corpus_report(args.input, sys.stdout, args.pattern, readers, processes,
+                            args.chunk_size, args.output_format, *sketch,
+                            top_words=args.top if args.frequency else 0, memory_map=args.mmap)
+        return
+    if args.batch:
+        source = open(args.input[0], 'r', encoding='utf-8') if args.input else sys.stdin
+        with source:
+            fields = STAT_FIELDS + ['top_words'] if args.frequency else STAT_FIELDS
+            writer = RecordWriter(sys.stdout, args.output_format, fields)
+            lines = (line.rstrip('\n') for line in source)
+            for stats in analyze_batch(lines, args.workers, sketch_capacity=sketch[0],
+                                       hll_precision=sketch[1]):
+                record = stats.get_comprehensive_stats()
+                if args.frequency:
+                    record['top_words'] = dict(stats.word_frequency(args.top))
+                writer.write(record)
+            writer.close()
+        return
+    machine_readable = args.output_format not in (None, 'text')
+    args.input = args.input[0] if args.input else None
+    
     counter = WordCounter()
     
     # Determine input source
@@ -211,7 +1257,10 @@ def main():
         print("📝 Interactive Mode - Enter your text (press Ctrl+D when finished):")
         try:
             text = sys.stdin.read()
-            counter.set_text(text)
+            if args.approximate:
+                counter = analyze_text(text, *sketch)
+            else:
+                counter.set_text(text)
         except KeyboardInterrupt:
             print("\n❌ Cancelled by user")
             sys.exit(1)
@@ -219,9 +1268,22 @@ def main():
         if not os.path.exists(args.input):
             print(f"❌ File not found: {args.input}")
             sys.exit(1)
-        if not counter.load_from_file(args.input):
+        if args.mmap:
+            try:
+                counter = analyze_mmap(args.input, args.chunk_size, *sketch)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"❌ Error reading file: {e}")
+                sys.exit(1)
+        elif args.stream:
+            try:
+                counter = analyze_file_parallel(args.input, args.workers, args.chunk_size, *sketch)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"❌ Error reading file: {e}")
+                sys.exit(1)
+        elif not counter.load_from_file(args.input):
             sys.exit(1)
-        print(f"📁 Analyzing file: {args.input}")
+        if not machine_readable:
+            print(f"📁 Analyzing file: {args.input}")
     else:
         # Read from stdin if available
         if sys.stdin.isatty():
@@ -231,6 +1293,8 @@ def main():
             print("  python word_counter.py --interactive")
             print("  echo 'Hello world' | python word_counter.py")
             sys.exit(1)
+        elif args.stream:
+            counter = analyze_stream_parallel(sys.stdin, args.workers, args.chunk_size, *sketch)
         else:
             text = sys.stdin.read()
             counter.set_text(text)
@@ -240,6 +1304,16 @@ def main():
         print("⚠️  No text to analyze!")
         sys.exit(1)
     
+    if machine_readable:
+        record = counter.get_comprehensive_stats()
+        if args.frequency:
+            record['top_words'] = dict(counter.word_frequency(args.top))
+        fields = STAT_FIELDS + ['top_words'] if args.frequency else STAT_FIELDS
+        writer = RecordWriter(sys.stdout, args.output_format, fields)
+        writer.write(record)
+        writer.close()
+        return
+    
     print_analysis(counter, args.frequency, args.top)
 
 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Persistent inverted index for the Word Counter Tool.
+
+Stores per-document term frequencies and document statistics in SQLite so
+that repeated questions about a document set ("top words", "which documents
+contain X", "how often does X occur") become index lookups instead of new
+analyses. Documents are keyed by absolute path and only re-analyzed when
+their size, mtime and content hash say they changed.
+
+Usage:
+    python word_index.py docs.db update docs/ --pattern '*.txt'
+    python word_index.py docs.db top -n 20
+    python word_index.py docs.db docs programming
+    python word_index.py docs.db freq programming
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from word_counter import DEFAULT_READERS, analyze_corpus, iter_corpus_files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id     INTEGER PRIMARY KEY,
+    path   TEXT NOT NULL UNIQUE,
+    size   INTEGER NOT NULL,
+    mtime  REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    stats  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    id    INTEGER PRIMARY KEY,
+    word  TEXT NOT NULL UNIQUE,
+    total INTEGER NOT NULL DEFAULT 0,
+    docs  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL REFERENCES terms(id),
+    doc_id  INTEGER NOT NULL REFERENCES documents(id),
+    count   INTEGER NOT NULL,
+    PRIMARY KEY (term_id, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_doc ON postings(doc_id);
+CREATE INDEX IF NOT EXISTS terms_by_total ON terms(total DESC);
+"""
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class WordIndex:
+    """SQLite-backed inverted index of term frequencies per document."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remove_document(self, doc_id: int):
+        """Drop a document's postings and take them out of the term totals."""
+        self.conn.execute("""
+            UPDATE terms SET
+                total = total - (SELECT count FROM postings WHERE term_id = terms.id AND doc_id = ?),
+                docs = docs - 1
+            WHERE id IN (SELECT term_id FROM postings WHERE doc_id = ?)
+        """, (doc_id, doc_id))
+        self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self.conn.execute("DELETE FROM terms WHERE docs = 0")
+
+    def _store_document(self, path: str, size: int, mtime: float, sha256: str, stats) -> int:
+        """Insert or replace a document and its postings."""
+        row = self.conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+        summary = json.dumps(stats.get_comprehensive_stats(), ensure_ascii=False)
+        if row:
+            doc_id = row[0]
+            self._remove_document(doc_id)
+            self.conn.execute("UPDATE documents SET size = ?, mtime = ?, sha256 = ?, stats = ? WHERE id = ?",
+                              (size, mtime, sha256, summary, doc_id))
+        else:
+            doc_id = self.conn.execute(
+                "INSERT INTO documents (path, size, mtime, sha256, stats) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime, sha256, summary)).lastrowid
+
+        counts = stats.words.items()
+        self.conn.executemany("""
+            INSERT INTO terms (word, total, docs) VALUES (?, ?, 1)
+            ON CONFLICT(word) DO UPDATE SET total = total + excluded.total, docs = docs + 1
+        """, counts)
+        self.conn.executemany("""
+            INSERT INTO postings (term_id, doc_id, count)
+            SELECT id, ?, ? FROM terms WHERE word = ?
+        """, ((doc_id, count, word) for word, count in counts))
+        return doc_id
+
+    def update(self, inputs: List[str], pattern: str = '*', readers: int = DEFAULT_READERS,
+               prune: bool = False) -> Dict[str, int]:
+        """Bring the index up to date with the files named by inputs.
+
+        A file whose size and mtime are unchanged is skipped without being
+        read; one whose content hash is unchanged only has its mtime updated.
+        With prune=True, indexed documents whose files are gone are removed.
+        Returns how many documents were added, updated, unchanged, removed or failed.
+        """
+        report = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        known = {path: (size, mtime, sha256) for path, size, mtime, sha256 in
+                 self.conn.execute("SELECT path, size, mtime, sha256 FROM documents")}
+
+        changed = {}
+        for path in map(os.path.abspath, iter_corpus_files(inputs, pattern)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                report['failed'] += 1
+                continue
+            old = known.get(path)
+            if old and old[0] == st.st_size and old[1] == st.st_mtime:
+                report['unchanged'] += 1
+                continue
+            sha256 = file_sha256(path)
+            if old and old[2] == sha256:
+                self.conn.execute("UPDATE documents SET size = ?, mtime = ? WHERE path = ?",
+                                  (st.st_size, st.st_mtime, path))
+                report['unchanged'] += 1
+                continue
+            changed[path] = (st.st_size, st.st_mtime, sha256)
+
+        with self.conn:
+            for _, path, stats, error in analyze_corpus(list(changed), readers):
+                if error is not None:
+                    report['failed'] += 1
+                    continue
+                report['updated' if path in known else 'added'] += 1
+                self._store_document(path, *changed[path], stats)
+
+            if prune:
+                for path in known:
+                    if not os.path.exists(path):
+                        self.remove(path)
+                        report['removed'] += 1
+        return report
+
+    def remove(self, path: str) -> bool:
+        """Remove a document from the index."""
+        row = self.conn.execute("SELECT id FROM documents WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        if not row:
+            return False
+        with self.conn:
+            self._remove_document(row[0])
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        return True
+
+    def top_words(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """Most frequent words across all documents as (word, occurrences, documents)."""
+        return self.conn.execute(
+            "SELECT word, total, docs FROM terms ORDER BY total DESC, word LIMIT ?", (n,)).fetchall()
+
+    def frequency(self, word: str) -> Tuple[int, int]:
+        """Occurrences of a word across all documents and the number of documents containing it."""
+        row = self.conn.execute("SELECT total, docs FROM terms WHERE word = ?",
+                                (word.lower(),)).fetchone()
+        return tuple(row) if row else (0, 0)
+
+    def documents_containing(self, word: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Documents containing a word as (path, occurrences), most occurrences first."""
+        return self.conn.execute("""
+            SELECT d.path, p.count FROM postings p
+            JOIN terms t ON t.id = p.term_id
+            JOIN documents d ON d.id = p.doc_id
+            WHERE t.word = ?
+            ORDER BY p.count DESC, d.path
+            LIMIT ?
+        """, (word.lower(), -1 if limit is None else limit)).fetchall()
+
+    def document_stats(self, path: str) -> Optional[Dict]:
+        """The comprehensive stats stored for a document."""
+        row = self.conn.execute("SELECT stats FROM documents WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def document_count(self) -> int:
+        """Number of indexed documents."""
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Word Index - persistent word statistics over a document set"
+    )
+    parser.add_argument('database', help='SQLite index file (created if missing)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help='Index new and changed files')
+    update.add_argument('inputs', nargs='+', help='Files, directories or glob patterns')
+    update.add_argument('--pattern', default='*',
+                        help="File name pattern inside directories (default: '*')")
+    update.add_argument('--readers', type=int, default=DEFAULT_READERS,
+                        help=f'Files analyzed concurrently (default: {DEFAULT_READERS})')
+    update.add_argument('--prune', action='store_true',
+                        help='Remove indexed documents whose files no longer exist')
+
+    top = commands.add_parser('top', help='Most frequent words across all documents')
+    top.add_argument('-n', type=int, default=10, help='Number of words (default: 10)')
+
+    docs = commands.add_parser('docs', help='Documents containing a word')
+    docs.add_argument('word')
+    docs.add_argument('-n', type=int, default=None, help='Maximum number of documents')
+
+    freq = commands.add_parser('freq', help='Frequency of a word across all documents')
+    freq.add_argument('word')
+
+    stats = commands.add_parser('stats', help='Stored statistics of one document')
+    stats.add_argument('path')
+
+    args = parser.parse_args()
+
+    with WordIndex(args.database) as index:
+        if args.command == 'update':
+            report = index.update(args.inputs, args.pattern, args.readers, args.prune)
+            print(f"📚 Indexed {index.document_count()} documents: "
+                  f"{report['added']} added, {report['updated']} updated, "
+                  f"{report['unchanged']} unchanged, {report['removed']} removed")
+            if report['failed']:
+                print(f"⚠️  {report['failed']} files could not be read")
+        elif args.command == 'top':
+            print(f"🔥 Top {args.n} words across {index.document_count()} documents:")
+            for i, (word, total, docs) in enumerate(index.top_words(args.n), 1):
+                print(f"   {i:2d}. '{word}' - {total} times in {docs} documents")
+        elif args.command == 'docs':
+            matches = index.documents_containing(args.word, args.n)
+            if not matches:
+                print(f"❌ No documents contain '{args.word}'")
+                sys.exit(1)
+            print(f"📁 Documents containing '{args.word}':")
+            for path, count in matches:
+                print(f"   {path} - {count} times")
+        elif args.command == 'freq':
+            total, docs = index.frequency(args.word)
+            print(f"🔍 '{args.word}' - {total} times in {docs} of {index.document_count()} documents")
+        elif args.command == 'stats':
+            summary = index.document_stats(args.path)
+            if summary is None:
+                print(f"❌ Not indexed: {args.path}")
+                sys.exit(1)
+            print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
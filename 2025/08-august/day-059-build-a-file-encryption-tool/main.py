@@ -6,13 +6,41 @@ Date: August 07, 2025
 365 Days of Code Challenge
 """
 
+import fnmatch
+import hashlib
+import itertools
+import json
 import os
+import struct
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.fernet import Fernet, InvalidToken
 
 # Get the directory where the script is located to robustly find the key file
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 KEY_PATH = os.path.join(SCRIPT_DIR, "secret.key")
 
+# Directory mode keeps a record of every processed file here
+MANIFEST_NAME = ".encryption-manifest.json"
+DEFAULT_JOBS = 4
+# Every Fernet token starts with version byte 0x80, which base64-encodes to this
+TOKEN_PREFIX = b"gAAAAA"
+
+# Streamed files are this magic and a random file ID in hex on the first line,
+# followed by one Fernet token per line. Each token holds the file ID (16
+# bytes), a chunk index (8 bytes), a last-chunk flag (1 byte) and up to
+# CHUNK_SIZE bytes of the file, so dropped, reordered, truncated or spliced
+# chunks are detected, even between files encrypted with the same key.
+# Files without the magic are a single token (the old format).
+STREAM_MAGIC = b"FERNET-STREAM v2 "
+FILE_ID_SIZE = 16
+CHUNK_SIZE = 1 << 20
+CHUNK_HEADER = struct.Struct(f">{FILE_ID_SIZE}sQB")
+# With --keep-original the file being replaced stays next to the result
+ORIGINAL_SUFFIX = ".orig"
+SPARSE_BLOCK = 1 << 16
+
 def generate_key():
     """
     Generates a key and saves it into a file in the script's directory
@@ -28,39 +56,304 @@ def load_key():
     """
     return open(KEY_PATH, "rb").read()
 
-def encrypt_file(filename, key):
+def token_length(size):
+    """
+    Length of the Fernet token for `size` bytes: version, timestamp, IV, the
+    PKCS7-padded ciphertext and the HMAC, base64-encoded
+    """
+    raw = 1 + 8 + 16 + (size // 16 + 1) * 16 + 32
+    return (raw + 2) // 3 * 4
+
+def encrypted_size(size):
+    """
+    Exact size of the streamed encryption of a `size`-byte file
+    """
+    chunks = max(1, -(-size // CHUNK_SIZE))
+    last = size - (chunks - 1) * CHUNK_SIZE
+    line = token_length(CHUNK_HEADER.size + CHUNK_SIZE) + 1
+    return len(STREAM_MAGIC) + 2 * FILE_ID_SIZE + 1 + (chunks - 1) * line + token_length(CHUNK_HEADER.size + last) + 1
+
+def read_chunks(file):
+    """
+    Yields (chunk, is_last) pairs of CHUNK_SIZE bytes; only the last can be short
+    """
+    chunk = file.read(CHUNK_SIZE)
+    while True:
+        following = file.read(CHUNK_SIZE) if len(chunk) == CHUNK_SIZE else b""
+        yield chunk, not following
+        if not following:
+            return
+        chunk = following
+
+def preallocate(file, size):
+    """
+    Reserves disk space up front, so a full disk fails before anything is written
+    """
+    if size and hasattr(os, "posix_fallocate"):
+        os.posix_fallocate(file.fileno(), 0, size)
+
+def write_sparse(file, data):
+    """
+    Writes data, seeking over all-zero blocks instead of writing them
+    """
+    for start in range(0, len(data), SPARSE_BLOCK):
+        block = data[start:start + SPARSE_BLOCK]
+        if block.count(0) == len(block):
+            file.seek(len(block), os.SEEK_CUR)
+        else:
+            file.write(block)
+
+def keep_backup(filename):
+    """
+    Keeps filename's current content as filename + ORIGINAL_SUFFIX, or with a
+    numbered suffix (.orig.1, .orig.2, ...) when that name is taken; an
+    existing file is never overwritten. Returns the backup's path
+    """
+    for number in itertools.count():
+        backup = filename + ORIGINAL_SUFFIX + (f".{number}" if number else "")
+        try:
+            os.link(filename, backup)
+            return backup
+        except FileExistsError:
+            continue
+        except OSError:
+            if os.path.lexists(backup):
+                continue
+            # No hard links here; the file is briefly missing, but never lost
+            os.replace(filename, backup)
+            return backup
+
+def replace_file(filename, write, keep_original=False):
+    """
+    Calls write(file) on a temporary file in the same directory, fsyncs it and
+    atomically renames it over filename. Until the rename the original is
+    untouched, so a crash at any point leaves either the old or the new file.
+    With keep_original the old file is kept by keep_backup, and the backup's
+    path is returned. A symlink is followed, so it is the target that gets replaced
+    """
+    # Renaming over the link itself would leave its target as plaintext
+    filename = os.path.realpath(filename)
+    directory = os.path.dirname(filename)
+    st = os.stat(filename)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(filename) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, st.st_mode & 0o7777)
+        try:
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+        except PermissionError:
+            pass
+
+        backup = keep_backup(filename) if keep_original else None
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # Make the rename itself durable
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return backup
+
+def encrypt_file(filename, key, verbose=True, keep_original=False, preallocate_space=False,
+                 backups=None):
     """
-    Given a filename (str) and key (bytes), it encrypts the file and writes it
+    Given a filename (str) and key (bytes), it encrypts the file and writes it.
+    The file is streamed in chunks of CHUNK_SIZE, so memory stays bounded, and
+    replaced atomically, so a crash never loses the plaintext. The path of a
+    kept original is added to the `backups` set if one is given
     """
     f = Fernet(key)
-    with open(filename, "rb") as file:
-        # read all file data
-        file_data = file.read()
+    file_id = os.urandom(FILE_ID_SIZE)
 
-    encrypted_data = f.encrypt(file_data)
+    def write(out):
+        if preallocate_space:
+            preallocate(out, encrypted_size(os.path.getsize(filename)))
+        out.write(STREAM_MAGIC + file_id.hex().encode() + b"\n")
+        with open(filename, "rb") as file:
+            for index, (chunk, last) in enumerate(read_chunks(file)):
+                out.write(f.encrypt(CHUNK_HEADER.pack(file_id, index, last) + chunk) + b"\n")
 
-    with open(filename, "wb") as file:
-        file.write(encrypted_data)
-    print(f"✅ File '{filename}' encrypted successfully.")
+    backup = replace_file(filename, write, keep_original)
+    if backup and backups is not None:
+        backups.add(backup)
+    if verbose:
+        print(f"✅ File '{filename}' encrypted successfully.")
+        if backup:
+            print(f"📁 Original kept as '{backup}'")
+    return True
 
-def decrypt_file(filename, key):
+def decrypt_file(filename, key, verbose=True, keep_original=False, preallocate_space=False,
+                 sparse=False, backups=None):
     """
-    Given a filename (str) and key (bytes), it decrypts the file and writes it
+    Given a filename (str) and key (bytes), it decrypts the file and writes it.
+    Streamed files are decrypted chunk by chunk; old single-token files whole.
+    With sparse, all-zero blocks become holes in the output. The path of a kept
+    original is added to the `backups` set if one is given.
+    Returns False if the key does not match or the data is corrupted
     """
     f = Fernet(key)
-    with open(filename, "rb") as file:
-        # read the encrypted data
-        encrypted_data = file.read()
+    max_line = token_length(CHUNK_HEADER.size + CHUNK_SIZE) + 1
+
+    def write(out):
+        if preallocate_space and not sparse:
+            # The plaintext is smaller than the input; the excess is truncated below
+            preallocate(out, os.path.getsize(filename))
+        emit = (lambda data: write_sparse(out, data)) if sparse else out.write
+        with open(filename, "rb") as file:
+            if file.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+                # read the encrypted data
+                file.seek(0)
+                emit(f.decrypt(file.read()))
+            else:
+                line = file.readline(2 * FILE_ID_SIZE + 1)
+                try:
+                    file_id = bytes.fromhex(line.decode("ascii"))
+                except ValueError:
+                    raise InvalidToken from None
+                index, last = 0, False
+                while not last:
+                    line = file.readline(max_line)
+                    if not line.endswith(b"\n"):
+                        raise InvalidToken  # truncated file
+                    data = f.decrypt(line[:-1])
+                    chunk_file_id, chunk_index, last = CHUNK_HEADER.unpack_from(data)
+                    if chunk_file_id != file_id:
+                        raise InvalidToken  # chunk spliced in from another file
+                    if chunk_index != index:
+                        raise InvalidToken  # dropped or reordered chunk
+                    emit(data[CHUNK_HEADER.size:])
+                    index += 1
+                if file.read(1):
+                    raise InvalidToken  # data after the last chunk
+        out.truncate(out.tell())
 
     try:
-        decrypted_data = f.decrypt(encrypted_data)
+        backup = replace_file(filename, write, keep_original)
     except InvalidToken:
-        print(f"❌ Error: Invalid key or corrupted data.")
-        return
+        if verbose:
+            print(f"❌ Error: Invalid key or corrupted data.")
+        return False
+
+    if backup and backups is not None:
+        backups.add(backup)
+    if verbose:
+        print(f"✅ File '{filename}' decrypted successfully.")
+        if backup:
+            print(f"📁 Original kept as '{backup}'")
+    return True
+
+def file_sha256(filename):
+    """
+    Hashes a file's contents in blocks
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def process_directory(action, directory, key, pattern="*", jobs=DEFAULT_JOBS, **options):
+    """
+    Encrypts or decrypts every file under directory in place, `jobs` files at a
+    time; options are passed on to encrypt_file or decrypt_file. A manifest in
+    the directory records the size, mtime and hash each file had when it was
+    last processed, so a rerun skips files that are already done. Encrypting
+    skips files that already start like a Fernet token or a streamed file, and
+    decrypting skips those that do not. The manifest also lists the backups
+    keep_original made, which are left alone; the key file is skipped. A file
+    that cannot be read is reported as an error and the rest of the run goes on.
+    Returns the number of processed and skipped files, bytes, seconds and errors
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {"files": {}}
+    entries = manifest["files"]
+    state = action + "ed"
+    real_directory = os.path.realpath(directory)
+    backups = {os.path.join(real_directory, rel) for rel in manifest.get("backups", [])}
 
-    with open(filename, "wb") as file:
-        file.write(decrypted_data)
-    print(f"✅ File '{filename}' decrypted successfully.")
+    def is_done(rel, path, st):
+        entry = entries.get(rel)
+        if not entry or entry["state"] != state:
+            return False
+        if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            return True
+        return entry["sha256"] == file_sha256(path)
+
+    report = {"processed": 0, "skipped": 0, "bytes": 0, "seconds": 0.0, "errors": []}
+    todo = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(fnmatch.filter(files, pattern)):
+            path = os.path.join(root, name)
+            # The manifest and the copies --keep-original made belong to this tool
+            real_path = os.path.realpath(path)
+            if name == MANIFEST_NAME or real_path in backups:
+                continue
+            rel = os.path.relpath(path, directory).replace(os.sep, "/")
+            # Never encrypt the key that decrypts everything
+            if real_path == KEY_PATH:
+                report["skipped"] += 1
+                continue
+            # A dangling link or unreadable file is one failure, not the end of the run
+            try:
+                st = os.stat(path)
+                if is_done(rel, path, st):
+                    report["skipped"] += 1
+                    continue
+                with open(path, "rb") as file:
+                    encrypted = file.read(len(STREAM_MAGIC)).startswith((STREAM_MAGIC, TOKEN_PREFIX))
+            except OSError as e:
+                report["errors"].append((rel, str(e)))
+                continue
+            # Files encrypted without the manifest, e.g. one by one, are never encrypted twice
+            if encrypted != (action == "decrypt"):
+                report["skipped"] += 1
+                continue
+            todo.append((rel, path, st.st_size))
+
+    process = encrypt_file if action == "encrypt" else decrypt_file
+
+    def run(item):
+        rel, path, size = item
+        try:
+            if not process(path, key, verbose=False, backups=backups, **options):
+                return rel, size, "Invalid key or corrupted data"
+            st = os.stat(path)
+            entries[rel] = {"state": state, "size": st.st_size, "mtime": st.st_mtime,
+                            "sha256": file_sha256(path)}
+            return rel, size, None
+        except Exception as e:
+            return rel, size, str(e) or type(e).__name__
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(jobs or os.cpu_count()) as pool:
+            for rel, size, error in pool.map(run, todo):
+                if error:
+                    report["errors"].append((rel, error))
+                else:
+                    report["processed"] += 1
+                    report["bytes"] += size
+    finally:
+        report["seconds"] = time.perf_counter() - start
+        manifest["backups"] = sorted(os.path.relpath(backup, real_directory).replace(os.sep, "/")
+                                     for backup in backups if os.path.lexists(backup))
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        os.replace(manifest_path + ".tmp", manifest_path)
+    return report
 
 
 import argparse
@@ -71,12 +364,25 @@ def main():
     parser.add_argument("action", choices=["generate-key", "encrypt", "decrypt"],
                         help="Action to perform: generate-key, encrypt, or decrypt")
     parser.add_argument("-f", "--file", dest="filepath",
-                        help="Path to the file to encrypt or decrypt")
+                        help="Path to the file, or directory of files, to encrypt or decrypt")
+    parser.add_argument("--pattern", default="*",
+                        help="Only process matching file names in directory mode (default: '*')")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Files processed at once in directory mode; 0 uses every core (default: {DEFAULT_JOBS})")
+    parser.add_argument("--keep-original", action="store_true",
+                        help=f"Keep the file being replaced as <file>{ORIGINAL_SUFFIX}, numbered if that exists")
+    parser.add_argument("--preallocate", action="store_true",
+                        help="Reserve the output's disk space before writing it")
+    parser.add_argument("--sparse", action="store_true",
+                        help="When decrypting, write all-zero blocks as holes")
 
     args = parser.parse_args()
 
     action = args.action
     filepath = args.filepath
+    options = {"keep_original": args.keep_original, "preallocate_space": args.preallocate}
+    if action == "decrypt":
+        options["sparse"] = args.sparse
 
     if action == "generate-key":
         generate_key()
@@ -93,10 +399,19 @@ def main():
             print("❌ Error: 'secret.key' not found. Please generate a key first with 'generate-key'.")
             return
 
-        if action == "encrypt":
-            encrypt_file(filepath, key)
+        if os.path.isdir(filepath):
+            report = process_directory(action, filepath, key, args.pattern, args.jobs, **options)
+            seconds = report["seconds"]
+            rate = report["bytes"] / seconds / 1e6 if seconds else 0.0
+            print(f"✅ {report['processed']} files {action}ed, {report['skipped']} skipped, "
+                  f"{len(report['errors'])} failed")
+            print(f"📊 {report['bytes'] / 1e6:.1f} MB in {seconds:.2f}s ({rate:.1f} MB/s)")
+            for rel, error in report["errors"]:
+                print(f"❌ {rel}: {error}")
+        elif action == "encrypt":
+            encrypt_file(filepath, key, **options)
         elif action == "decrypt":
-            decrypt_file(filepath, key)
+            decrypt_file(filepath, key, **options)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Test script for the file encryption tool
+"""
+
+import json
+import os
+import tempfile
+from unittest import mock
+from cryptography.fernet import Fernet
+import main
+from main import CHUNK_SIZE, MANIFEST_NAME, ORIGINAL_SUFFIX, decrypt_file, encrypt_file
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_round_trip():
+    """Test chunk boundaries, the predicted size and replacing the file atomically."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file")
+        for size in [0, 1, 100, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 3 * CHUNK_SIZE]:
+            content = os.urandom(size)
+            write(path, content)
+            inode = os.stat(path).st_ino
+
+            assert encrypt_file(path, key, verbose=False, preallocate_space=True)
+            assert os.path.getsize(path) == main.encrypted_size(size), \
+                f"Preallocated output should be exactly the encrypted size for {size} bytes"
+            assert os.stat(path).st_ino != inode, "The result should be renamed over the original"
+
+            assert decrypt_file(path, key, verbose=False, preallocate_space=True)
+            assert read(path) == content, f"Round trip failed for {size} bytes"
+
+        assert os.listdir(tmp) == ["file"], "No temporary files should be left behind"
+        print("✅ Round trip test passed!")
+
+def test_tamper_detection():
+    """Test that dropped, reordered, truncated and extended streams are refused untouched."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file")
+        write(path, os.urandom(3 * CHUNK_SIZE + 5))
+        encrypt_file(path, key, verbose=False)
+        encrypted = read(path)
+        magic, *tokens = encrypted.split(b"\n")[:-1]
+
+        tampered = [
+            [magic] + tokens[:1] + tokens[2:],
+            [magic, tokens[1], tokens[0]] + tokens[2:],
+            [magic] + tokens[:-1],
+            [magic] + tokens + tokens[-1:],
+        ]
+        for parts in tampered:
+            data = b"\n".join(parts) + b"\n"
+            write(path, data)
+            assert not decrypt_file(path, key, verbose=False), "Tampered file should not decrypt"
+            assert read(path) == data, "A failed decryption should leave the file as it was"
+
+        write(path, encrypted[:-10])
+        assert not decrypt_file(path, key, verbose=False), "Truncated token should not decrypt"
+        write(path, encrypted)
+        assert not decrypt_file(path, Fernet.generate_key(), verbose=False)
+        assert os.listdir(tmp) == ["file"], "No temporary files should be left behind"
+        print("✅ Tamper detection test passed!")
+
+def test_splice_detection():
+    """Test that chunks moved between files encrypted with the same key are refused."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = os.path.join(tmp, "first"), os.path.join(tmp, "second")
+        write(first, os.urandom(2 * CHUNK_SIZE + 5))
+        write(second, os.urandom(2 * CHUNK_SIZE + 5))
+        encrypt_file(first, key, verbose=False)
+        encrypt_file(second, key, verbose=False)
+        header, *tokens = read(first).split(b"\n")[:-1]
+        other_header, *other_tokens = read(second).split(b"\n")[:-1]
+        assert header != other_header, "Every file should get its own ID"
+
+        spliced = [
+            [header, tokens[0], other_tokens[1], tokens[2]],
+            [other_header] + tokens,
+            [header] + other_tokens,
+        ]
+        for parts in spliced:
+            data = b"\n".join(parts) + b"\n"
+            write(first, data)
+            assert not decrypt_file(first, key, verbose=False), "Spliced file should not decrypt"
+            assert read(first) == data, "A failed decryption should leave the file as it was"
+        print("✅ Splice detection test passed!")
+
+def test_legacy_format():
+    """Test that files holding a single Fernet token still decrypt."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "old")
+        write(path, Fernet(key).encrypt(b"old format"))
+        assert decrypt_file(path, key, verbose=False)
+        assert read(path) == b"old format"
+        print("✅ Legacy format test passed!")
+
+def test_keep_original_and_metadata():
+    """Test --keep-original, never overwriting a backup, kept permissions and following symlinks."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file")
+        write(path, b"keep me")
+        os.chmod(path, 0o640)
+
+        assert encrypt_file(path, key, verbose=False, keep_original=True)
+        assert read(path + ORIGINAL_SUFFIX) == b"keep me"
+        assert os.stat(path).st_mode & 0o777 == 0o640, "Permissions should be kept"
+        assert decrypt_file(path, key, verbose=False)
+        assert read(path) == b"keep me"
+
+        assert encrypt_file(path, key, verbose=False, keep_original=True)
+        assert read(path + ORIGINAL_SUFFIX) == b"keep me", "An existing backup should be left alone"
+        assert read(path + ORIGINAL_SUFFIX + ".1") == b"keep me"
+        assert decrypt_file(path, key, verbose=False)
+        os.unlink(path + ORIGINAL_SUFFIX + ".1")
+
+        link = os.path.join(tmp, "link")
+        os.symlink("file", link)
+        assert encrypt_file(link, key, verbose=False)
+        assert os.path.islink(link), "The link itself should stay a link"
+        assert read(path).startswith(main.STREAM_MAGIC), "The link target should be encrypted"
+        assert decrypt_file(link, key, verbose=False)
+        assert read(path) == b"keep me"
+        assert read(path + ORIGINAL_SUFFIX) == b"keep me"
+        print("✅ Keep original test passed!")
+
+def test_sparse_output():
+    """Test that --sparse restores the content and leaves zero runs as holes."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sparse")
+        with open(path, 'wb') as f:
+            f.write(b"start")
+            f.seek(20 * CHUNK_SIZE)
+            f.write(b"end")
+        content = read(path)
+
+        encrypt_file(path, key, verbose=False)
+        assert decrypt_file(path, key, verbose=False, sparse=True)
+        assert read(path) == content
+        st = os.stat(path)
+        # Some file systems have no holes; there the file is simply dense
+        if st.st_blocks * 512 < st.st_size:
+            assert st.st_blocks * 512 < CHUNK_SIZE, "Zero runs should not be allocated"
+        print("✅ Sparse output test passed!")
+
+def test_directory_mode():
+    """Test recursive encryption, skipping on rerun and without a manifest, backups and per-file errors."""
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        contents = {"a.txt": b"first", "a.txt.orig": b"not a backup", "sub/b.bin": os.urandom(1000),
+                    "sub/deeper/c.txt": b""}
+        for rel, content in contents.items():
+            path = os.path.join(tmp, *rel.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write(path, content)
+        key_path = os.path.join(tmp, "secret.key")
+        write(key_path, key)
+
+        with mock.patch.object(main, 'KEY_PATH', key_path):
+            report = main.process_directory('encrypt', tmp, key, jobs=3, keep_original=True)
+            assert (report['processed'], report['skipped'], report['errors']) == (4, 1, [])
+            assert read(key_path) == key, "The key file should never be encrypted"
+            assert read(os.path.join(tmp, "a.txt.orig")).startswith(main.STREAM_MAGIC), \
+                "A user's .orig file should be encrypted like any other"
+            with open(os.path.join(tmp, MANIFEST_NAME)) as f:
+                backups = json.load(f)['backups']
+            assert backups == ["a.txt.orig.1", "a.txt.orig.orig", "sub/b.bin.orig", "sub/deeper/c.txt.orig"]
+
+            report = main.process_directory('encrypt', tmp, key)
+            assert (report['processed'], report['skipped']) == (0, 5), "Done files should be skipped"
+            assert read(os.path.join(tmp, "sub", "b.bin.orig")) == contents["sub/b.bin"], \
+                "Backups should be left alone"
+            for backup in backups:
+                os.unlink(os.path.join(tmp, *backup.split('/')))
+
+            os.unlink(os.path.join(tmp, MANIFEST_NAME))
+            report = main.process_directory('encrypt', tmp, key)
+            assert (report['processed'], report['skipped']) == (0, 5), \
+                "Encrypted files should not be encrypted twice without a manifest"
+
+            os.symlink("missing", os.path.join(tmp, "dangling"))
+            report = main.process_directory('decrypt', tmp, key, jobs=2)
+            assert report['processed'] == 4
+            assert [rel for rel, error in report['errors']] == ["dangling"], \
+                "An unreadable file should be reported without stopping the run"
+
+        for rel, content in contents.items():
+            assert read(os.path.join(tmp, *rel.split('/'))) == content, f"{rel} did not round trip"
+        with open(os.path.join(tmp, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        assert {entry['state'] for entry in manifest['files'].values()} == {"decrypted"}
+        print("✅ Directory mode test passed!")
+
+if __name__ == "__main__":
+    print("Running encryption tool tests...")
+    test_round_trip()
+    test_tamper_detection()
+    test_splice_detection()
+    test_legacy_format()
+    test_keep_original_and_metadata()
+    test_sparse_output()
+    test_directory_mode()
+    print("\n✨ All tests completed successfully!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the fractal renderer.
+
+Renders a fixed matrix of views (size x max_iter x zoom depth x backend),
+reports throughput, compute vs encode time and peak memory, writes the
+results to JSON and compares them against a stored baseline.
+
+    python benchmark.py --quick --save-baseline
+    python benchmark.py --quick --threshold 0.15
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import PIL
+
+import fractal
+from encoding import FORMATS, PRESETS, encode
+
+SIZES = [(320, 240), (800, 600), (1600, 1200)]
+MAX_ITERS = [256, 2000]
+# Zoom depths: the whole set, a moderately deep spiral and a deep filament
+VIEWS = {
+    'full': ((-0.75, 0.0), 1.0),
+    'seahorse': ((-0.745, 0.11), 100.0),
+    'deep': ((-0.7436438870371587, 0.1318259042053090), 1e6),
+}
+BACKENDS = ['numpy', 'optimized']
+
+QUICK_SIZES = [(320, 240)]
+QUICK_MAX_ITERS = [256, 1000]
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+def _peak_rss_bytes():
+    """Returns the peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _run_case(case, repeat, image_format, preset):
+    """Renders one case and returns its best timings; runs in a fresh process."""
+    (width, height), max_iter, view, backend, strategy = case
+    center, zoom = VIEWS[view]
+
+    compute, encoding, size = [], [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = fractal.generate_mandelbrot(width, height, max_iter, backend, center, zoom,
+                                          strategy=strategy)
+        compute.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        size = len(encode(img, image_format, preset))
+        encoding.append(time.perf_counter() - start)
+
+    pixels = width * height
+    return {
+        'id': f'{width}x{height}/{max_iter}/{view}/{backend}/{strategy}/{image_format}-{preset}',
+        'width': width,
+        'height': height,
+        'max_iter': max_iter,
+        'view': view,
+        'backend': backend,
+        'strategy': strategy,
+        'format': image_format,
+        'preset': preset,
+        'compute_seconds': min(compute),
+        'encode_seconds': min(encoding),
+        'megapixels_per_second': pixels / min(compute) / 1e6,
+        'encode_fraction': min(encoding) / (min(compute) + min(encoding)),
+        'encoded_bytes': size,
+        'peak_rss_bytes': _peak_rss_bytes(),
+    }
+
+def run_matrix(cases, repeat=3, image_format='png', preset='balanced'):
+    """Runs every case in its own process so peak RSS is measured per case."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for case in cases:
+        with context.Pool(1) as pool:
+            result = pool.apply(_run_case, (case, repeat, image_format, preset))
+        results.append(result)
+        print(f"{result['id']:<58} {result['megapixels_per_second']:8.2f} MP/s  "
+              f"compute {result['compute_seconds'] * 1000:8.1f} ms  "
+              f"encode {result['encode_seconds'] * 1000:7.1f} ms  "
+              f"rss {result['peak_rss_bytes'] / 2**20:6.1f} MiB")
+    return results
+
+def compare(results, baseline, threshold):
+    """Returns a description of every case that regressed beyond threshold."""
+    previous = {r['id']: r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['id'])
+        if old is None:
+            continue
+
+        checks = [
+            ('megapixels_per_second', result['megapixels_per_second'] < old['megapixels_per_second'] * (1 - threshold)),
+            ('encode_seconds', result['encode_seconds'] > old['encode_seconds'] * (1 + threshold)),
+            ('peak_rss_bytes', result['peak_rss_bytes'] > old['peak_rss_bytes'] * (1 + threshold)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{result['id']}: {metric} {old[metric]:.4g} -> {result[metric]:.4g}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fractal renderer")
+    parser.add_argument('--quick', action='store_true',
+                        help='Small sizes only, for a fast check')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS,
+                        choices=sorted(fractal.BACKENDS), help='Backends to benchmark')
+    parser.add_argument('--strategies', nargs='+', default=['full'],
+                        choices=sorted(fractal.STRATEGIES), help='Strategies to benchmark')
+    parser.add_argument('--format', dest='image_format', default='png', choices=sorted(FORMATS),
+                        help='Encoding format to time (default: png)')
+    parser.add_argument('--preset', default='balanced', choices=sorted(PRESETS),
+                        help='Compression preset to time (default: balanced)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Renders per case; the fastest one is reported (default: 3)')
+    parser.add_argument('--output', '-o', default='benchmark_results.json',
+                        help='Where to write the results (default: benchmark_results.json)')
+    parser.add_argument('--baseline', '-b', default=DEFAULT_BASELINE,
+                        help=f'Baseline to compare against (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store these results as the new baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown counted as a regression (default: 0.10)')
+
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    max_iters = QUICK_MAX_ITERS if args.quick else MAX_ITERS
+    cases = list(itertools.product(sizes, max_iters, VIEWS, args.backends, args.strategies))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': run_matrix(cases, args.repeat, args.image_format, args.preset),
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    regressions = compare(report['results'], baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import io
+
+import numpy as np
+
+# Output formats and their MIME types; 'raw' is packed 8-bit RGB rows for internal clients
+FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'raw': 'application/octet-stream',
+}
+
+# Encoder settings trading encode time against payload size. WebP stays
+# lossless so every format carries exactly the rendered pixels.
+PRESETS = {
+    'fast': {
+        'png': {'compress_level': 1},
+        'webp': {'lossless': True, 'quality': 0, 'method': 0},
+    },
+    'balanced': {
+        'png': {'compress_level': 6},
+        'webp': {'lossless': True, 'quality': 50, 'method': 4},
+    },
+    'small': {
+        'png': {'compress_level': 9, 'optimize': True},
+        'webp': {'lossless': True, 'quality': 100, 'method': 6},
+    },
+}
+
+def encode(img, image_format='png', preset='balanced'):
+    """Encodes a PIL image to bytes in the given format with a compression preset."""
+    if image_format not in FORMATS:
+        raise ValueError(f"Unknown format '{image_format}', expected one of {sorted(FORMATS)}")
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset '{preset}', expected one of {sorted(PRESETS)}")
+
+    if image_format == 'raw':
+        return np.asarray(img).tobytes()
+
+    buf = io.BytesIO()
+    img.save(buf, format=image_format.upper(), **PRESETS[preset][image_format])
+    return buf.getvalue()
+
+def png_compress_level(preset):
+    """Returns the zlib level a preset uses for PNG, for encoders that stream."""
+    return PRESETS[preset]['png']['compress_level']
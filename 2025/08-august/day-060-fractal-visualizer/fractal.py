@@ -1,34 +1,453 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
 from PIL import Image
-import io
-
-def generate_mandelbrot(width, height, max_iter):
-    """Generates a Mandelbrot set image."""
-    img = Image.new('RGB', (width, height), 'black')
-    pixels = img.load()
-
-    for x in range(width):
-        for y in range(height):
-            zx, zy = x * (3.5 / width) - 2.5, y * (2.0 / height) - 1.0
-            c = zx + zy * 1j
-            z = c
-            for i in range(max_iter):
-                if abs(z) > 2.0:
-                    break
-                z = z * z + c
-
-            # Color the pixel based on the number of iterations
-            color = (i % 8 * 32, i % 16 * 16, i % 32 * 8)
-            pixels[x, y] = color
-
-    return img
-
-def get_mandelbrot_image(width=800, height=600, max_iter=256):
-    """Returns the Mandelbrot set as a PNG image in memory."""
-    img = generate_mandelbrot(width, height, max_iter)
-
-    # Save the image to a memory buffer
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
-
-    return buf
+import numpy as np
+from collections import deque
+from encoding import encode
+import os
+import time
+
+# View of the whole set: a 3.5 x 2.0 window of the complex plane
+DEFAULT_CENTER = (-0.75, 0.0)
+
+# Tiles split a 4.0 x 4.0 square around the set into 2**z x 2**z tiles
+TILE_SIZE = 256
+TILE_WORLD_ORIGIN = (-2.75, -2.0)
+TILE_WORLD_SPAN = 4.0
+
+def _axes(width, height, center=DEFAULT_CENTER, zoom=1.0):
+    """Returns the real and imaginary coordinates of every column and row."""
+    cx, cy = center
+    xs = np.arange(width) * (3.5 / zoom / width) + (cx - 1.75 / zoom)
+    ys = np.arange(height) * (2.0 / zoom / height) + (cy - 1.0 / zoom)
+    return xs, ys
+
+def _tile_axes(z, x, y, size=TILE_SIZE):
+    """Returns the coordinates of the columns and rows of tile (z, x, y)."""
+    span = TILE_WORLD_SPAN / 2 ** z
+    xs = np.arange(size) * (span / size) + (TILE_WORLD_ORIGIN[0] + x * span)
+    ys = np.arange(size) * (span / size) + (TILE_WORLD_ORIGIN[1] + y * span)
+    return xs, ys
+
+def _smooth(i, radius):
+    """Continuous iteration count of a point that escaped at i with |z| = radius."""
+    return np.maximum(i + 1 - np.log2(np.log(radius)), 0.0)
+
+def _mandelbrot_python(cr, ci, max_iter, smooth=False):
+    """Reference escape-time loop: one Python complex per pixel."""
+    counts = np.empty(cr.shape, dtype=np.float64 if smooth else np.int64)
+
+    for k, (zx, zy) in enumerate(zip(cr.tolist(), ci.tolist())):
+        c = zx + zy * 1j
+        z = c
+        for i in range(max_iter):
+            if abs(z) > 2.0:
+                break
+            z = z * z + c
+
+        if smooth and abs(z) > 2.0:
+            counts[k] = _smooth(i, abs(z))
+        else:
+            counts[k] = i
+
+    return counts
+
+def _mandelbrot_numpy(cr, ci, max_iter, smooth=False):
+    """Vectorized escape-time loop over whole arrays of c-values."""
+    # Points that never escape keep the last loop index, like the reference
+    counts = np.full(cr.shape, max_iter - 1, dtype=np.float64 if smooth else np.int64)
+
+    # Only the points that have not escaped yet are kept in the working set.
+    # Real and imaginary parts are updated with the same float operations as
+    # Python's complex type so the escape counts match the reference exactly.
+    idx = np.arange(cr.size)
+    zr, zi = cr.copy(), ci.copy()
+    for i in range(max_iter):
+        radius = np.hypot(zr, zi)
+        escaped = radius > 2.0
+        if escaped.any():
+            counts[idx[escaped]] = _smooth(i, radius[escaped]) if smooth else i
+            alive = ~escaped
+            idx, zr, zi, cr, ci = idx[alive], zr[alive], zi[alive], cr[alive], ci[alive]
+            if not idx.size:
+                break
+        zr, zi = zr * zr - zi * zi + cr, zr * zi + zi * zr + ci
+
+    return counts
+
+# Two orbit points closer than this are treated as the same point of a cycle
+PERIOD_TOLERANCE = 1e-13
+
+def _interior(cr, ci):
+    """Marks points inside the main cardioid or the period-2 bulb."""
+    q = (cr - 0.25) ** 2 + ci * ci
+    cardioid = q * (q + (cr - 0.25)) <= 0.25 * ci * ci
+    bulb = (cr + 1.0) ** 2 + ci * ci <= 0.0625
+    return cardioid | bulb
+
+def _mandelbrot_optimized(cr, ci, max_iter, smooth=False):
+    """Escape-time loop that skips interior points instead of iterating them."""
+    counts = np.full(cr.shape, max_iter - 1, dtype=np.float64 if smooth else np.int64)
+
+    # The cardioid and the period-2 bulb never escape, so they are never iterated
+    idx = np.flatnonzero(~_interior(cr, ci))
+    cr, ci = cr[idx], ci[idx]
+    zr, zi = cr.copy(), ci.copy()
+
+    # Brent-style cycle detection: remember the orbit point at the start of
+    # each window, doubling the window so cycles of any period are caught
+    saved_r, saved_i = np.full_like(zr, np.nan), np.full_like(zi, np.nan)
+    window, next_save = 1, 0
+
+    for i in range(max_iter):
+        if not idx.size:
+            break
+
+        radius = np.hypot(zr, zi)
+        escaped = radius > 2.0
+        # Orbits that came back to the saved point are periodic: interior
+        periodic = ((np.abs(zr - saved_r) < PERIOD_TOLERANCE)
+                    & (np.abs(zi - saved_i) < PERIOD_TOLERANCE))
+        done = escaped | periodic
+        if done.any():
+            counts[idx[escaped]] = _smooth(i, radius[escaped]) if smooth else i
+            alive = ~done
+            idx, zr, zi, cr, ci = idx[alive], zr[alive], zi[alive], cr[alive], ci[alive]
+            saved_r, saved_i = saved_r[alive], saved_i[alive]
+
+        if i == next_save:
+            saved_r, saved_i = zr.copy(), zi.copy()
+            next_save += window
+            window *= 2
+
+        zr, zi = zr * zr - zi * zi + cr, zr * zi + zi * zr + ci
+
+    return counts
+
+# Escape-time kernels: map flat arrays of c-values to iteration counts
+BACKENDS = {
+    'python': _mandelbrot_python,
+    'numpy': _mandelbrot_numpy,
+    'optimized': _mandelbrot_optimized,
+}
+
+def _full(xs, ys, max_iter, backend, smooth):
+    """Iterates every pixel of the grid spanned by xs and ys."""
+    shape = (len(ys), len(xs))
+    cr = np.broadcast_to(xs[np.newaxis, :], shape).ravel()
+    ci = np.broadcast_to(ys[:, np.newaxis], shape).ravel()
+    return BACKENDS[backend](cr, ci, max_iter, smooth).reshape(shape), cr.size
+
+# Rectangles with a side shorter than this are iterated instead of split
+SUBDIVIDE_MIN_SIZE = 6
+
+def _border(y0, x0, y1, x1):
+    """Returns the slices covering the edges of an inclusive rectangle."""
+    return [
+        (y0, slice(x0, x1 + 1)), (y1, slice(x0, x1 + 1)),
+        (slice(y0, y1 + 1), x0), (slice(y0, y1 + 1), x1),
+    ]
+
+def _subdivide(xs, ys, max_iter, backend, smooth, kernel=None):
+    """Mariani-Silver rendering: iterates rectangle borders and fills uniform interiors.
+
+    When the whole border of a rectangle has a single iteration count its
+    interior is filled without iterating; otherwise the rectangle is split in
+    four. Rectangles are processed level by level so that every level costs
+    a single kernel call over all the pixels it needs. kernel replaces the
+    backend's own function, e.g. to spread those calls over the pool.
+    """
+    kernel = kernel or BACKENDS[backend]
+    height, width = len(ys), len(xs)
+    counts = np.zeros((height, width), dtype=np.float64 if smooth else np.int64)
+    known = np.zeros((height, width), dtype=bool)
+    iterated = 0
+
+    def iterate(wanted):
+        """Runs the kernel on the wanted pixels that are not known yet."""
+        nonlocal iterated
+        wanted &= ~known
+        rows, cols = np.nonzero(wanted)
+        if rows.size:
+            counts[rows, cols] = kernel(xs[cols], ys[rows], max_iter, smooth)
+            known[rows, cols] = True
+            iterated += rows.size
+
+    rects = [(0, 0, height - 1, width - 1)]
+    while rects:
+        wanted = np.zeros((height, width), dtype=bool)
+        for rect in rects:
+            for edge in _border(*rect):
+                wanted[edge] = True
+        iterate(wanted)
+
+        wanted = np.zeros((height, width), dtype=bool)
+        children = []
+        for y0, x0, y1, x1 in rects:
+            if y1 - y0 < 2 or x1 - x0 < 2:
+                continue
+            edges = np.concatenate([counts[edge].ravel() for edge in _border(y0, x0, y1, x1)])
+            if (edges == edges[0]).all():
+                counts[y0 + 1:y1, x0 + 1:x1] = edges[0]
+                known[y0 + 1:y1, x0 + 1:x1] = True
+            elif y1 - y0 < SUBDIVIDE_MIN_SIZE or x1 - x0 < SUBDIVIDE_MIN_SIZE:
+                wanted[y0 + 1:y1, x0 + 1:x1] = True
+            else:
+                ym, xm = (y0 + y1) // 2, (x0 + x1) // 2
+                children += [(y0, x0, ym, xm), (y0, xm, ym, x1), (ym, x0, y1, xm), (ym, xm, y1, x1)]
+
+        # Small rectangles are iterated outright in the same batch
+        iterate(wanted)
+        rects = children
+
+    return counts, iterated
+
+# Strategies decide which pixels are iterated; they return the counts and
+# how many pixels actually went through the kernel
+STRATEGIES = {
+    'full': _full,
+    'subdivide': _subdivide,
+}
+
+def _classic(counts):
+    """The original banded coloring."""
+    rgb = np.empty(counts.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = counts % 8 * 32
+    rgb[..., 1] = counts % 16 * 16
+    rgb[..., 2] = counts % 32 * 8
+    return rgb
+
+def _grayscale(counts):
+    """Brightness grows with the iteration count, repeating every 256."""
+    return np.repeat((counts % 256).astype(np.uint8)[..., np.newaxis], 3, axis=-1)
+
+def _fire(counts):
+    """Black through red and yellow to white, repeating every 96 iterations."""
+    t = counts % 96
+    rgb = np.empty(counts.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = np.minimum(t * 8, 255)
+    rgb[..., 1] = np.clip(t * 8 - 256, 0, 255)
+    rgb[..., 2] = np.clip(t * 8 - 512, 0, 255)
+    return rgb
+
+def _ocean(counts):
+    """Deep blue through cyan, repeating every 64 iterations."""
+    t = counts % 64
+    rgb = np.empty(counts.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = t * 2
+    rgb[..., 1] = t * 4
+    rgb[..., 2] = 128 + t * 2
+    return rgb
+
+PALETTES = {
+    'classic': _classic,
+    'grayscale': _grayscale,
+    'fire': _fire,
+    'ocean': _ocean,
+}
+
+def colorize(counts, palette='classic'):
+    """Maps iteration counts to an RGB buffer of shape (height, width, 3)."""
+    if palette not in PALETTES:
+        raise ValueError(f"Unknown palette '{palette}', expected one of {sorted(PALETTES)}")
+    return PALETTES[palette](counts)
+
+# Worker pool shared by every render once start_pool() has been called
+_pool = None
+_pool_workers = 0
+_tile_rows = 64
+# Pool kernel calls are split into pieces of at least this many pixels
+MIN_POOL_PIXELS = 4096
+
+def _render_band(shm_name, width, height, xs, ys, y0, max_iter, backend, palette, smooth, strategy):
+    """Renders rows y0.. of the image straight into the shared RGB buffer."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        rgb = np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf)
+        counts, iterated = STRATEGIES[strategy](xs, ys, max_iter, backend, smooth)
+        rgb[y0:y0 + len(ys)] = colorize(counts, palette)
+        del rgb
+    finally:
+        shm.close()
+    return iterated
+
+def _render_rows(xs, ys, max_iter, backend, palette, smooth, strategy):
+    """Renders a few rows in a pool worker and returns their RGB buffer."""
+    counts, _ = STRATEGIES[strategy](xs, ys, max_iter, backend, smooth)
+    return colorize(counts, palette)
+
+def _warm_up(_):
+    """Imports and exercises the render path inside a pool worker."""
+    xs, ys = _axes(8, 8)
+    _full(xs, ys, 8, 'numpy', False)
+    return os.getpid()
+
+def start_pool(workers=None, tile_rows=64):
+    """Starts the process pool used for tiled rendering and warms it up."""
+    global _pool, _pool_workers, _tile_rows
+    shutdown_pool()
+
+    workers = workers or os.cpu_count() or 1
+    _pool_workers = workers
+    # Workers must share our resource tracker, otherwise each one would try to
+    # clean up the shared render buffers it attached to when it exits
+    resource_tracker.ensure_running()
+    _pool = ProcessPoolExecutor(max_workers=workers)
+    _tile_rows = max(1, tile_rows)
+
+    # Spawn every worker now so the first request doesn't pay for it
+    list(_pool.map(_warm_up, range(workers)))
+
+def shutdown_pool():
+    """Stops the tiled rendering pool, if one is running."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+def _render_tiled(xs, ys, max_iter, backend, palette, smooth, strategy):
+    """Renders row bands on the process pool and stitches them together."""
+    width, height = len(xs), len(ys)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, width * height * 3))
+    try:
+        futures = [
+            _pool.submit(_render_band, shm.name, width, height, xs, ys[y0:y0 + _tile_rows],
+                         y0, max_iter, backend, palette, smooth, strategy)
+            for y0 in range(0, height, _tile_rows)
+        ]
+        iterated = sum(future.result() for future in futures)
+
+        rgb = np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return rgb, iterated
+
+def _pooled_kernel(backend):
+    """Returns a kernel that splits each call into pieces iterated on the pool."""
+    kernel = BACKENDS[backend]
+
+    def run(cr, ci, max_iter, smooth):
+        pieces = max(1, min(4 * _pool_workers, cr.size // MIN_POOL_PIXELS))
+        bounds = np.linspace(0, cr.size, pieces + 1).astype(int)
+        futures = [_pool.submit(kernel, cr[a:b], ci[a:b], max_iter, smooth)
+                   for a, b in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate([future.result() for future in futures])
+
+    return run
+
+def _check_options(backend, palette, strategy):
+    """Rejects unknown backends, palettes and strategies."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+    if palette not in PALETTES:
+        raise ValueError(f"Unknown palette '{palette}', expected one of {sorted(PALETTES)}")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {sorted(STRATEGIES)}")
+
+def _render(xs, ys, max_iter, backend, palette, smooth=False, strategy='full', stats=None):
+    """Renders the grid spanned by xs and ys into an RGB buffer."""
+    _check_options(backend, palette, strategy)
+
+    if _pool is not None and strategy == 'subdivide':
+        # Bands would restart the border tracing at every band edge, so the
+        # whole frame is subdivided here and only the kernel calls go to the pool
+        counts, iterated = _subdivide(xs, ys, max_iter, backend, smooth, _pooled_kernel(backend))
+        rgb = colorize(counts, palette)
+    elif _pool is not None:
+        rgb, iterated = _render_tiled(xs, ys, max_iter, backend, palette, smooth, strategy)
+    else:
+        counts, iterated = STRATEGIES[strategy](xs, ys, max_iter, backend, smooth)
+        # Color every pixel based on the number of iterations in one pass
+        rgb = colorize(counts, palette)
+
+    if stats is not None:
+        pixels = len(xs) * len(ys)
+        stats.update(pixels=pixels, iterated=iterated,
+                     iterated_fraction=iterated / pixels if pixels else 0.0)
+    return rgb
+
+def generate_mandelbrot(width, height, max_iter, backend='numpy', center=DEFAULT_CENTER,
+                        zoom=1.0, palette='classic', smooth=False, strategy='full', stats=None):
+    """Generates a Mandelbrot set image.
+
+    If a stats dict is passed it receives the number of pixels, how many of
+    them were iterated and the iterated fraction.
+    """
+    xs, ys = _axes(width, height, center, zoom)
+    return Image.fromarray(_render(xs, ys, max_iter, backend, palette, smooth, strategy, stats))
+
+def generate_tile(z, x, y, max_iter=256, backend='numpy', palette='classic', smooth=False,
+                  strategy='full', stats=None):
+    """Generates the TILE_SIZE x TILE_SIZE tile at column x, row y of zoom level z."""
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"Tile ({x}, {y}) is outside zoom level {z}")
+
+    xs, ys = _tile_axes(z, x, y)
+    return Image.fromarray(_render(xs, ys, max_iter, backend, palette, smooth, strategy, stats))
+
+def get_mandelbrot_image(width=800, height=600, max_iter=256, backend='numpy', center=DEFAULT_CENTER,
+                         zoom=1.0, palette='classic', smooth=False, strategy='full', stats=None,
+                         image_format='png', preset='balanced'):
+    """Returns the Mandelbrot set as encoded image bytes (PNG by default)."""
+    img = generate_mandelbrot(width, height, max_iter, backend, center, zoom, palette, smooth,
+                              strategy, stats)
+    return encode(img, image_format, preset)
+
+def get_tile_image(z, x, y, max_iter=256, backend='numpy', palette='classic', smooth=False,
+                   strategy='full', stats=None, image_format='png', preset='balanced'):
+    """Returns a map tile of the Mandelbrot set as encoded image bytes."""
+    img = generate_tile(z, x, y, max_iter, backend, palette, smooth, strategy, stats)
+    return encode(img, image_format, preset)
+
+def iter_mandelbrot_rows(width, height, max_iter, backend='numpy', center=DEFAULT_CENTER,
+                         zoom=1.0, palette='classic', smooth=False, strategy='full', band_rows=32):
+    """Yields the RGB buffer of the image band by band, from top to bottom.
+
+    With the pool running, the next bands are rendered ahead on every worker
+    while the earlier ones are being sent.
+    """
+    xs, ys = _axes(width, height, center, zoom)
+    starts = range(0, height, band_rows)
+    if _pool is None:
+        for y0 in starts:
+            yield _render(xs, ys[y0:y0 + band_rows], max_iter, backend, palette, smooth, strategy)
+        return
+
+    _check_options(backend, palette, strategy)
+    pending = deque()
+    try:
+        for y0 in starts:
+            pending.append(_pool.submit(_render_rows, xs, ys[y0:y0 + band_rows], max_iter,
+                                        backend, palette, smooth, strategy))
+            if len(pending) >= _pool_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def compare_backends(width=800, height=600, max_iter=256, center=DEFAULT_CENTER, zoom=1.0,
+                     backends=('numpy', 'optimized'), smooth=False, strategy='full'):
+    """Times each backend on the same view and counts pixels that differ from the first."""
+    xs, ys = _axes(width, height, center, zoom)
+    results = {}
+    reference = None
+
+    for backend in backends:
+        start = time.perf_counter()
+        counts, iterated = STRATEGIES[strategy](xs, ys, max_iter, backend, smooth)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = counts
+        results[backend] = {
+            'seconds': elapsed,
+            'speedup': results[backends[0]]['seconds'] / elapsed if results else 1.0,
+            'mismatched_pixels': int(np.count_nonzero(counts != reference)),
+            'iterated_fraction': iterated / counts.size,
+        }
+
+    return results
@@ -1,23 +1,306 @@
-from flask import Flask, render_template, send_file
-from fractal import get_mandelbrot_image
+import base64
+import json
+import os
+import queue
+from flask import Flask, Response, abort, make_response, render_template, request
+from fractal import (DEFAULT_CENTER, PALETTES, STRATEGIES, TILE_SIZE,
+                     get_mandelbrot_image, iter_mandelbrot_rows, start_pool)
+from encoding import FORMATS, PRESETS, png_compress_level
+from png_stream import iter_png
+from render_cache import RenderCache, make_key
+from render_queue import QueueBusy, RenderQueue
+from tiles import MAX_ZOOM, TilePrefetcher, render_tile, tile_key
 
 app = Flask(__name__)
 
+# Size of the render pool; 0 keeps rendering in the request thread
+RENDER_WORKERS = int(os.environ.get('FRACTAL_WORKERS', os.cpu_count() or 1))
+# Number of image rows each pool task renders
+RENDER_TILE_ROWS = int(os.environ.get('FRACTAL_TILE_ROWS', 64))
+# Escape-time kernel used unless a request picks another one
+RENDER_BACKEND = os.environ.get('FRACTAL_BACKEND', 'optimized')
+# Backends a request may pick; the pure-Python reference would tie up a worker
+# for hours on a large, deep render, so it is left to the CLI and tests
+REQUEST_BACKENDS = ('numpy', 'optimized')
+# Which pixels get iterated: 'full' or 'subdivide' (Mariani-Silver)
+RENDER_STRATEGY = os.environ.get('FRACTAL_STRATEGY', 'full')
+
+# In-memory budget for cached PNGs and an optional directory for the disk tier
+CACHE_BYTES = int(os.environ.get('FRACTAL_CACHE_BYTES', 64 * 1024 * 1024))
+CACHE_DIR = os.environ.get('FRACTAL_CACHE_DIR') or None
+# How long browsers may reuse a render before revalidating it
+CACHE_MAX_AGE = int(os.environ.get('FRACTAL_CACHE_MAX_AGE', 3600))
+
+# Compression preset used unless a request picks another: 'fast', 'balanced' or 'small'
+ENCODE_PRESET = os.environ.get('FRACTAL_ENCODE_PRESET', 'balanced')
+
+# Downscaling factors of the passes sent by /fractal/progressive, coarsest first
+PROGRESSIVE_SCALES = (8, 4, 2, 1)
+# Rows computed and flushed at a time by /fractal.png?stream=1
+STREAM_BAND_ROWS = int(os.environ.get('FRACTAL_STREAM_BAND_ROWS', 32))
+
+# Tiles around the ones being viewed that may be queued for rendering at once
+PREFETCH_LIMIT = int(os.environ.get('FRACTAL_PREFETCH_LIMIT', 4))
+
+# Renders run on a bounded queue so concurrent requests can't starve the server
+QUEUE_WORKERS = int(os.environ.get('FRACTAL_QUEUE_WORKERS', 4))
+QUEUE_DEPTH = int(os.environ.get('FRACTAL_QUEUE_DEPTH', 32))
+# Renders one client may have queued or running at once
+CLIENT_LIMIT = int(os.environ.get('FRACTAL_CLIENT_LIMIT', 4))
+
+render_cache = RenderCache(CACHE_BYTES, CACHE_DIR)
+render_queue = RenderQueue(QUEUE_WORKERS, QUEUE_DEPTH, CLIENT_LIMIT)
+tile_prefetcher = TilePrefetcher(render_cache, render_queue, PREFETCH_LIMIT) if PREFETCH_LIMIT > 0 else None
+
+def _query_param(name, cast, default, low, high):
+    """Reads a numeric query parameter and enforces its bounds."""
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+
+    try:
+        value = cast(raw)
+    except ValueError:
+        abort(400, description=f"'{name}' must be a {cast.__name__}")
+
+    if not low <= value <= high:
+        abort(400, description=f"'{name}' must be between {low} and {high}")
+    return value
+
+def _choice_param(name, choices, default):
+    """Reads a query parameter that must be one of a fixed set of names."""
+    value = request.args.get(name, default)
+    if value not in choices:
+        abort(400, description=f"'{name}' must be one of {', '.join(sorted(choices))}")
+    return value
+
+def _image_format():
+    """Picks the output format from ?format= or, failing that, the Accept header."""
+    if 'format' in request.args:
+        return _choice_param('format', FORMATS, 'png')
+
+    # Raw RGB is only sent to clients that ask for it explicitly; */* gets PNG
+    mimetypes = {mimetype: name for name, mimetype in FORMATS.items()}
+    best = request.accept_mimetypes.best_match(['image/png', 'image/webp', FORMATS['raw']],
+                                               default='image/png')
+    return mimetypes[best]
+
+def _style_params():
+    """Collects the kernel, coloring and encoding parameters shared by images and tiles."""
+    return {
+        'max_iter': _query_param('max_iter', int, 256, 1, 10000),
+        'backend': _choice_param('backend', REQUEST_BACKENDS, RENDER_BACKEND),
+        'palette': _choice_param('palette', PALETTES, 'classic'),
+        'smooth': _query_param('smooth', int, 0, 0, 1) == 1,
+        'strategy': _choice_param('strategy', STRATEGIES, RENDER_STRATEGY),
+        'image_format': _image_format(),
+        'preset': _choice_param('preset', PRESETS, ENCODE_PRESET),
+    }
+
+def _render_params():
+    """Collects and validates the render parameters of the current request."""
+    return {
+        'width': _query_param('width', int, 800, 16, 4096),
+        'height': _query_param('height', int, 600, 16, 4096),
+        'center': (
+            _query_param('cx', float, DEFAULT_CENTER[0], -4.0, 4.0),
+            _query_param('cy', float, DEFAULT_CENTER[1], -4.0, 4.0),
+        ),
+        'zoom': _query_param('zoom', float, 1.0, 0.1, 1e13),
+        **_style_params(),
+    }
+
+def _busy_response(error):
+    """Turns a refused render into a 429 or 503 response with Retry-After."""
+    response = make_response(f'{error}\n', error.status)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _submit(key, render, client):
+    """Queues a render and caches its result, aborting the request if it is refused."""
+    def job():
+        data = render()
+        render_cache.put(key, data)
+        return data
+
+    try:
+        return render_queue.submit(key, job, client)
+    except QueueBusy as e:
+        abort(_busy_response(e))
+
+def _stream_and_cache(key, stream, client):
+    """Runs a streaming render on the queue, relaying its chunks as they are produced."""
+    chunks = queue.Queue()
+
+    def job():
+        parts = []
+        try:
+            for chunk in stream():
+                parts.append(chunk)
+                chunks.put(chunk)
+        finally:
+            chunks.put(None)
+        render_cache.put(key, b''.join(parts))
+
+    # Streams are not coalesced: every client reads its own copy
+    try:
+        future = render_queue.submit(None, job, client)
+    except QueueBusy as e:
+        abort(_busy_response(e))
+
+    def relay():
+        while (chunk := chunks.get()) is not None:
+            yield chunk
+        future.result()
+
+    return relay()
+
+def _cached_image(key, render, image_format, size, stream=None):
+    """Serves an encoded image from the render cache with validators for the browser.
+
+    On a miss the image comes from render(), or, when given, is sent chunk
+    by chunk as stream() produces it.
+    """
+    # The ETag is the content address, so a matching one never needs a render
+    if key in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        data = render_cache.get(key)
+        if data is None and stream is not None:
+            response = Response(_stream_and_cache(key, stream, request.remote_addr))
+        else:
+            if data is None:
+                data = _submit(key, render, request.remote_addr).result()
+            response = make_response(data)
+        response.mimetype = FORMATS[image_format]
+
+    # Raw pixels carry no header of their own
+    if image_format == 'raw':
+        response.headers['X-Image-Width'], response.headers['X-Image-Height'] = map(str, size)
+
+    response.vary.add('Accept')
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/map')
+def tile_map():
+    return render_template('map.html', max_zoom=MAX_ZOOM)
+
 @app.route('/fractal.png')
 def fractal_image():
-    # You can customize the parameters here if you want
-    # For example: /fractal.png?width=1024&height=768
-    width = 800
-    height = 600
-    max_iter = 256
+    # Every parameter can be customized from the query string
+    # For example: /fractal.png?width=1024&height=768&cx=-0.5&zoom=4
+    # Adding stream=1 sends rows to the browser as soon as they are computed
+    params = _render_params()
+    key = make_key(kind='fractal', **params)
+
+    stream = None
+    if _query_param('stream', int, 0, 0, 1) and params['image_format'] == 'png':
+        view = {k: v for k, v in params.items() if k not in ('image_format', 'preset')}
+        stream = lambda: iter_png(params['width'], params['height'],
+                                  iter_mandelbrot_rows(**view, band_rows=STREAM_BAND_ROWS),
+                                  png_compress_level(params['preset']))
+
+    size = (params['width'], params['height'])
+    return _cached_image(key, lambda: get_mandelbrot_image(**params),
+                         params['image_format'], size, stream)
+
+@app.route('/fractal/progressive')
+def fractal_progressive():
+    # Server-sent events with coarse previews first, then the full image
+    params = _render_params()
+    # Passes are shown as data URLs, so raw pixels are out of the question
+    if params['image_format'] == 'raw':
+        params['image_format'] = 'png'
+    final_key = make_key(kind='fractal', **params)
+
+    # A cached full render makes the previews pointless
+    scales = PROGRESSIVE_SCALES if render_cache.get(final_key) is None else (1,)
+    client = request.remote_addr
+
+    def passes():
+        for scale in scales:
+            width, height = params['width'] // scale, params['height'] // scale
+            if scale > 1 and min(width, height) < 8:
+                continue
+
+            view = dict(params, width=width, height=height)
+            key = make_key(kind='fractal', **view)
+            data = render_cache.get(key)
+            if data is None:
+                try:
+                    data = render_queue.submit(
+                        key, lambda: get_mandelbrot_image(**view), client).result()
+                except QueueBusy as e:
+                    yield f'event: busy\ndata: {json.dumps({"retry_after": e.retry_after})}\n\n'
+                    return
+                render_cache.put(key, data)
+
+            event = {
+                'scale': scale,
+                'width': width,
+                'height': height,
+                'image': f"data:{FORMATS[params['image_format']]};base64,"
+                         + base64.b64encode(data).decode('ascii'),
+            }
+            yield f'event: pass\ndata: {json.dumps(event)}\n\n'
+        yield 'event: done\ndata: {}\n\n'
+
+    response = Response(passes(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.png')
+def fractal_tile(z, x, y):
+    if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        abort(404)
+
+    options = _style_params()
+    key = tile_key(z, x, y, **options)
+
+    response = _cached_image(key, lambda: render_tile(z, x, y, **options),
+                             options['image_format'], (TILE_SIZE, TILE_SIZE))
 
-    img_buf = get_mandelbrot_image(width, height, max_iter)
+    # Pan in any direction should find its next tiles already rendered
+    if tile_prefetcher is not None:
+        tile_prefetcher.prefetch_around(z, x, y, **options)
+    return response
 
-    return send_file(img_buf, mimetype='image/png')
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format
+    stats = render_queue.metrics()
+    done = stats['completed'] + stats['failed']
+    lines = [
+        f"fractal_queue_workers {stats['workers']}",
+        f"fractal_queue_depth {stats['depth']}",
+        f"fractal_queue_max_depth {stats['max_depth']}",
+        f"fractal_queue_inflight {stats['inflight']}",
+        f"fractal_queue_clients {stats['clients']}",
+        f"fractal_queue_submitted_total {stats['submitted']}",
+        f"fractal_queue_coalesced_total {stats['coalesced']}",
+        f'fractal_queue_jobs_total{{result="completed"}} {stats["completed"]}',
+        f'fractal_queue_jobs_total{{result="failed"}} {stats["failed"]}',
+        f'fractal_queue_rejected_total{{reason="queue_full"}} {stats["rejected_queue_full"]}',
+        f'fractal_queue_rejected_total{{reason="client_limit"}} {stats["rejected_client_limit"]}',
+        f"fractal_queue_wait_seconds_sum {stats['wait_seconds_total']:.6f}",
+        f"fractal_queue_wait_seconds_count {done}",
+        f"fractal_queue_wait_seconds_max {stats['wait_seconds_max']:.6f}",
+        f"fractal_queue_run_seconds_sum {stats['run_seconds_total']:.6f}",
+        f"fractal_cache_bytes {render_cache.size}",
+        f"fractal_cache_hits_total {render_cache.hits}",
+        f"fractal_cache_misses_total {render_cache.misses}",
+    ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain')
 
 if __name__ == '__main__':
+    # Warm the pool once at startup so every request reuses the same workers
+    if RENDER_WORKERS > 0:
+        start_pool(RENDER_WORKERS, RENDER_TILE_ROWS)
     app.run(host='0.0.0.0', port=5000)
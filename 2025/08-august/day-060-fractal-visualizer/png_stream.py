@@ -0,0 +1,41 @@
+import numpy as np
+import struct
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _chunk(kind, data):
+    """Frames data as a PNG chunk: length, type, data and CRC."""
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+def iter_png(width, height, bands, compress_level=6):
+    """Encodes RGB row bands as a PNG, yielding bytes as soon as each band is compressed.
+
+    bands is an iterable of uint8 arrays of shape (rows, width, 3) that
+    together cover the image from top to bottom. Every band is flushed into
+    its own IDAT chunk, so a client can decode and draw the rows it already
+    received while the rest of the image is still being computed.
+    """
+    # 8-bit truecolor, deflate, adaptive filtering, no interlace
+    yield PNG_SIGNATURE + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    compressor = zlib.compressobj(compress_level)
+    rows_sent = 0
+    for band in bands:
+        if band.shape[1:] != (width, 3):
+            raise ValueError(f"Expected bands of shape (rows, {width}, 3), got {band.shape}")
+
+        # Every row starts with its filter type; 0 means unfiltered
+        raw = np.zeros((len(band), 1 + width * 3), dtype=np.uint8)
+        raw[:, 1:] = band.reshape(len(band), -1)
+        rows_sent += len(band)
+
+        data = compressor.compress(raw.tobytes()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield _chunk(b'IDAT', data)
+
+    if rows_sent != height:
+        raise ValueError(f"Bands covered {rows_sent} rows, expected {height}")
+
+    yield _chunk(b'IDAT', compressor.flush()) + _chunk(b'IEND', b'')
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+# Part of every key, so renders of older code are never served again. Bump it
+# whenever a kernel, palette or encoder changes what a set of parameters renders to
+RENDER_VERSION = 1
+
+def make_key(**params):
+    """Returns a content address for a render: the SHA-256 of its parameters and RENDER_VERSION."""
+    blob = json.dumps(dict(params, render_version=RENDER_VERSION), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """Caches encoded renders in an in-memory LRU and an optional disk tier."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        """Returns the on-disk location of a cached render; bodies may be PNG, WebP or raw."""
+        return os.path.join(self.disk_dir, key[:2], key + '.bin')
+
+    def _remember(self, key, data):
+        """Stores data in the LRU, evicting old entries to stay under budget."""
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.size += len(data)
+
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __contains__(self, key):
+        """Whether key is cached, without counting a hit or miss or refreshing the LRU."""
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                # Promote disk hits so the next lookup stays in memory
+                self._remember(key, data)
+                with self._lock:
+                    self.hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """Stores data in memory and, if configured, on disk."""
+        self._remember(key, data)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see half an image
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
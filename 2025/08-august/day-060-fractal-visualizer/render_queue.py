@@ -0,0 +1,152 @@
+from collections import Counter
+from concurrent.futures import Future
+import math
+import queue
+import threading
+import time
+
+class QueueBusy(Exception):
+    """Raised when a render is refused; retry_after is a hint in seconds."""
+
+    status = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QueueFull(QueueBusy):
+    """The queue already holds as many jobs as it may."""
+
+class ClientLimitExceeded(QueueBusy):
+    """The client already has as many renders queued or running as it may."""
+
+    status = 429
+
+class RenderQueue:
+    """Bounded render queue served by a fixed pool of worker threads.
+
+    Identical jobs (same key) that are queued or running share one render,
+    each client may only have a few jobs of its own in flight, and once the
+    queue is full new jobs are refused instead of piling up.
+    """
+
+    def __init__(self, workers=4, max_depth=32, per_client=4):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.per_client = per_client
+        self._jobs = queue.Queue(maxsize=max_depth)
+        self._inflight = {}
+        self._clients = Counter()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._wait_max = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._work, name=f'render-{n}', daemon=True)
+            for n in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _retry_after(self):
+        """Estimates how long the current backlog takes to drain, in whole seconds."""
+        done = self._stats['completed'] + self._stats['failed']
+        average = self._stats['run_seconds'] / done if done else 1.0
+        return max(1, math.ceil(average * (self._jobs.qsize() + 1) / self.workers))
+
+    def submit(self, key, render, client=None):
+        """Queues render() and returns a Future for its result.
+
+        A key of None disables coalescing for the job. Raises QueueFull or
+        ClientLimitExceeded when the job is refused.
+        """
+        with self._lock:
+            if key is not None and key in self._inflight:
+                self._stats['coalesced'] += 1
+                return self._inflight[key]
+
+            if self._clients[client] >= self.per_client:
+                self._stats['rejected_client_limit'] += 1
+                raise ClientLimitExceeded(f'Too many renders in flight for {client}', self._retry_after())
+
+            future = Future()
+            try:
+                self._jobs.put_nowait((key, render, client, future, time.monotonic()))
+            except queue.Full:
+                self._stats['rejected_queue_full'] += 1
+                raise QueueFull('Render queue is full', self._retry_after()) from None
+
+            self._stats['submitted'] += 1
+            self._clients[client] += 1
+            if key is not None:
+                self._inflight[key] = future
+        return future
+
+    def depth(self):
+        """Returns the number of jobs waiting for a worker."""
+        return self._jobs.qsize()
+
+    def render(self, key, render, client=None):
+        """Runs render() on the queue and waits for its result."""
+        return self.submit(key, render, client).result()
+
+    def _work(self):
+        """Worker loop: takes jobs off the queue until shutdown() sends None."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+
+            key, render, client, future, queued_at = job
+            started = time.monotonic()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(render())
+                        outcome = 'completed'
+                    except BaseException as e:
+                        future.set_exception(e)
+                        outcome = 'failed'
+                else:
+                    outcome = 'cancelled'
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    if key is not None:
+                        self._inflight.pop(key, None)
+                    self._clients[client] -= 1
+                    if self._clients[client] <= 0:
+                        del self._clients[client]
+
+                    wait = started - queued_at
+                    self._stats[outcome] += 1
+                    self._stats['wait_seconds'] += wait
+                    self._stats['run_seconds'] += finished - started
+                    self._wait_max = max(self._wait_max, wait)
+
+    def metrics(self):
+        """Returns a snapshot of the queue counters."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'depth': self._jobs.qsize(),
+                'max_depth': self._jobs.maxsize,
+                'inflight': sum(self._clients.values()),
+                'clients': len(self._clients),
+                'submitted': self._stats['submitted'],
+                'coalesced': self._stats['coalesced'],
+                'completed': self._stats['completed'],
+                'failed': self._stats['failed'],
+                'rejected_queue_full': self._stats['rejected_queue_full'],
+                'rejected_client_limit': self._stats['rejected_client_limit'],
+                'wait_seconds_total': self._stats['wait_seconds'],
+                'wait_seconds_max': self._wait_max,
+                'run_seconds_total': self._stats['run_seconds'],
+            }
+
+    def shutdown(self):
+        """Stops the workers once the jobs already queued are done."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
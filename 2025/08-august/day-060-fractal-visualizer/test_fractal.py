@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Tests for the fractal renderer, its cache, render queue, map tiles and web endpoints
+"""
+
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+import benchmark
+import encoding
+import fractal
+import main
+import render_cache
+from png_stream import iter_png
+from render_cache import RenderCache, make_key
+from render_queue import ClientLimitExceeded, QueueFull, RenderQueue
+from tiles import TilePrefetcher, neighbours, tile_key
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_kernels_match_python_reference(self):
+        """The numpy and optimized kernels give the reference counts pixel for pixel."""
+        views = [((-0.75, 0.0), 1.0), ((-0.745, 0.11), 100.0)]
+        for center, zoom in views:
+            for smooth in (False, True):
+                xs, ys = fractal._axes(48, 32, center, zoom)
+                reference, _ = fractal._full(xs, ys, 300, 'python', smooth)
+                for backend in ('numpy', 'optimized'):
+                    with self.subTest(center=center, smooth=smooth, backend=backend):
+                        counts, _ = fractal._full(xs, ys, 300, backend, smooth)
+                        np.testing.assert_array_equal(counts, reference)
+
+    def test_compare_backends(self):
+        """The backend comparison finds no mismatched pixels on a deep view."""
+        results = fractal.compare_backends(120, 90, 500, (-0.745, 0.11), 100.0)
+        self.assertEqual([r['mismatched_pixels'] for r in results.values()], [0, 0])
+
+    def test_subdivide_iterates_fewer_pixels(self):
+        """Boundary tracing matches the full render almost everywhere with far less work."""
+        stats = {}
+        full = np.asarray(fractal.generate_mandelbrot(400, 300, 500))
+        traced = np.asarray(fractal.generate_mandelbrot(400, 300, 500, strategy='subdivide', stats=stats))
+        self.assertLess(stats['iterated_fraction'], 0.5)
+        self.assertLess(np.count_nonzero((full != traced).any(axis=-1)), 0.001 * 400 * 300)
+
+    def test_unknown_options(self):
+        """Unknown backends, palettes and strategies are rejected."""
+        for options in ({'backend': 'gpu'}, {'palette': 'neon'}, {'strategy': 'guess'}):
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                fractal.generate_mandelbrot(16, 16, 10, **options)
+
+
+class TestRenderPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        fractal.start_pool(2, tile_rows=16)
+
+    @classmethod
+    def tearDownClass(cls):
+        fractal.shutdown_pool()
+
+    def test_pool_matches_serial(self):
+        """Pooled renders and streamed bands are identical to serial renders."""
+        for strategy in ('full', 'subdivide'):
+            with self.subTest(strategy=strategy):
+                stats = {}
+                pooled = np.asarray(fractal.generate_mandelbrot(160, 120, 400, strategy=strategy,
+                                                                stats=stats))
+                streamed = np.concatenate(list(fractal.iter_mandelbrot_rows(160, 120, 400,
+                                                                            strategy=strategy,
+                                                                            band_rows=7)))
+                fractal.shutdown_pool()
+                try:
+                    serial_stats = {}
+                    serial = np.asarray(fractal.generate_mandelbrot(160, 120, 400, strategy=strategy,
+                                                                    stats=serial_stats))
+                    bands = np.concatenate(list(fractal.iter_mandelbrot_rows(160, 120, 400,
+                                                                             strategy=strategy,
+                                                                             band_rows=7)))
+                finally:
+                    fractal.start_pool(2, tile_rows=16)
+                np.testing.assert_array_equal(pooled, serial)
+                np.testing.assert_array_equal(streamed, bands)
+                if strategy == 'subdivide':
+                    # The whole frame is traced at once, not band by band
+                    self.assertEqual(stats['iterated'], serial_stats['iterated'])
+
+
+class TestPngStream(unittest.TestCase):
+
+    def test_stream_decodes_to_the_bands(self):
+        """A PNG streamed band by band decodes to exactly those pixels."""
+        rgb = np.random.default_rng(0).integers(0, 256, (37, 23, 3), dtype=np.uint8)
+        bands = [rgb[y:y + 5] for y in range(0, 37, 5)]
+        data = b''.join(iter_png(23, 37, bands))
+        np.testing.assert_array_equal(np.asarray(Image.open(io.BytesIO(data))), rgb)
+
+    def test_wrong_bands(self):
+        """Bands of the wrong width or too few rows are refused."""
+        with self.assertRaises(ValueError):
+            b''.join(iter_png(4, 4, [np.zeros((4, 5, 3), dtype=np.uint8)]))
+        with self.assertRaises(ValueError):
+            b''.join(iter_png(4, 4, [np.zeros((3, 4, 3), dtype=np.uint8)]))
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_formats_keep_pixels(self):
+        """Every format and preset carries exactly the rendered pixels."""
+        img = fractal.generate_mandelbrot(40, 30, 100)
+        for image_format in ('png', 'webp'):
+            for preset in encoding.PRESETS:
+                with self.subTest(image_format=image_format, preset=preset):
+                    data = encoding.encode(img, image_format, preset)
+                    decoded = Image.open(io.BytesIO(data)).convert('RGB')
+                    np.testing.assert_array_equal(np.asarray(decoded), np.asarray(img))
+        self.assertEqual(encoding.encode(img, 'raw'), np.asarray(img).tobytes())
+        with self.assertRaises(ValueError):
+            encoding.encode(img, 'gif')
+
+    def test_images_are_bytes(self):
+        """Encoded images and tiles are returned as bytes."""
+        self.assertIsInstance(fractal.get_mandelbrot_image(16, 16, 10), bytes)
+        self.assertIsInstance(fractal.get_tile_image(0, 0, 0, 10, image_format='raw'), bytes)
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def test_keys(self):
+        """Keys ignore parameter order but not values."""
+        self.assertEqual(make_key(a=1, b=2), make_key(b=2, a=1))
+        self.assertNotEqual(make_key(a=1, b=2), make_key(a=1, b=3))
+        key = make_key(a=1, b=2)
+        with mock.patch('render_cache.RENDER_VERSION', render_cache.RENDER_VERSION + 1):
+            self.assertNotEqual(make_key(a=1, b=2), key, "A new render version must not reuse old keys")
+
+    def test_lru_eviction(self):
+        """The memory tier evicts the least recently used entries to stay in budget."""
+        cache = RenderCache(max_bytes=10)
+        cache.put('a', b'1234')
+        cache.put('b', b'1234')
+        self.assertEqual(cache.get('a'), b'1234')
+        cache.put('c', b'1234')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'1234')
+        self.assertLessEqual(cache.size, 10)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_disk_tier(self):
+        """Renders on disk survive a new cache and are promoted to memory."""
+        with tempfile.TemporaryDirectory() as tmp:
+            RenderCache(disk_dir=tmp).put('ab12', b'webp bytes')
+            cache = RenderCache(disk_dir=tmp)
+            self.assertEqual(cache.get('ab12'), b'webp bytes')
+            self.assertIn('ab12', cache._entries)
+
+
+class TestRenderQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def blocked(self, value):
+        def render():
+            self.started.set()
+            self.release.wait(5)
+            return value
+        return render
+
+    def test_coalescing(self):
+        """Identical queued jobs share one render."""
+        q = RenderQueue(workers=1, max_depth=4, per_client=4)
+        try:
+            first = q.submit('key', self.blocked('image'))
+            second = q.submit('key', self.blocked('other'))
+            self.assertIs(first, second)
+            self.release.set()
+            self.assertEqual(second.result(5), 'image')
+            self.assertEqual(q.metrics()['coalesced'], 1)
+        finally:
+            self.release.set()
+            q.shutdown()
+
+    def test_backpressure(self):
+        """A full queue answers 503 and a greedy client 429, both with Retry-After."""
+        q = RenderQueue(workers=1, max_depth=1, per_client=2)
+        try:
+            q.submit('running', self.blocked(1), client='a')
+            self.started.wait(5)
+            q.submit('queued', self.blocked(2), client='a')
+
+            with self.assertRaises(ClientLimitExceeded) as limited:
+                q.submit('third', self.blocked(3), client='a')
+            self.assertEqual(limited.exception.status, 429)
+
+            with self.assertRaises(QueueFull) as full:
+                q.submit('fourth', self.blocked(4), client='b')
+            self.assertEqual(full.exception.status, 503)
+            self.assertGreaterEqual(full.exception.retry_after, 1)
+        finally:
+            self.release.set()
+            q.shutdown()
+
+
+class TestTiles(unittest.TestCase):
+
+    def test_neighbours(self):
+        """Neighbours stay on the zoom level's grid."""
+        self.assertEqual(sorted(neighbours(1, 0, 0)), [(0, 1), (1, 0), (1, 1)])
+        self.assertEqual(len(list(neighbours(3, 4, 4))), 8)
+        self.assertEqual(list(neighbours(0, 0, 0)), [])
+
+    def test_prefetch_fills_cache(self):
+        """The tiles around a viewed one are rendered into the cache on the render queue."""
+        cache = RenderCache()
+        q = RenderQueue(workers=2, max_depth=16, per_client=8)
+        prefetcher = TilePrefetcher(cache, q, max_pending=8)
+        try:
+            prefetcher.prefetch_around(1, 0, 0, max_iter=50, palette='classic')
+            keys = [tile_key(1, x, y, max_iter=50, palette='classic') for x, y in neighbours(1, 0, 0)]
+            deadline = time.monotonic() + 10
+            while not all(key in cache for key in keys) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(all(key in cache for key in keys))
+            self.assertEqual(q.metrics()['submitted'], len(keys))
+            self.assertEqual((cache.hits, cache.misses), (0, 0), 'Prefetching should not count lookups')
+        finally:
+            q.shutdown()
+
+    def test_prefetch_backs_off(self):
+        """Prefetches beyond max_pending, or into a half-full queue, are dropped."""
+        started, release = threading.Event(), threading.Event()
+        q = RenderQueue(workers=1, max_depth=8, per_client=8)
+        try:
+            q.submit('blocker', lambda: started.set() or release.wait(5), client='viewer')
+            started.wait(5)
+            prefetcher = TilePrefetcher(RenderCache(), q, max_pending=2)
+            prefetcher.prefetch_around(3, 4, 4, max_iter=50)
+            self.assertEqual(q.metrics()['depth'], 2, 'Only max_pending prefetches should be queued')
+
+            for n in range(2):
+                q.submit(f'queued-{n}', lambda: None, client='viewer')
+            prefetcher = TilePrefetcher(RenderCache(), q, max_pending=8)
+            prefetcher.prefetch_around(3, 1, 1, max_iter=50)
+            self.assertEqual(q.metrics()['depth'], 4, 'A half-full queue should take no prefetches')
+        finally:
+            release.set()
+            q.shutdown()
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_compare_flags_regressions(self):
+        """Only cases that got slower or bigger beyond the threshold are reported."""
+        old = {'id': 'case', 'megapixels_per_second': 10.0, 'encode_seconds': 1.0,
+               'peak_rss_bytes': 100}
+        baseline = {'results': [old]}
+        self.assertEqual(benchmark.compare([dict(old, megapixels_per_second=9.5)], baseline, 0.1), [])
+        regressions = benchmark.compare([dict(old, megapixels_per_second=8.0, peak_rss_bytes=200)],
+                                        baseline, 0.1)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(benchmark.compare([dict(old, id='new')], baseline, 0.1), [])
+
+
+class TestEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def test_format_negotiation(self):
+        """The format comes from ?format=, then from Accept; */* gets PNG."""
+        url = '/fractal.png?width=32&height=24'
+        cases = [
+            ({}, '', 'image/png'),
+            ({'Accept': 'image/webp,*/*'}, '', 'image/webp'),
+            ({'Accept': '*/*'}, '', 'image/png'),
+            ({'Accept': 'image/webp'}, '&format=png', 'image/png'),
+        ]
+        for headers, query, mimetype in cases:
+            with self.subTest(headers=headers, query=query):
+                response = self.client.get(url + query, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.mimetype, mimetype)
+                self.assertIn('Accept', response.vary)
+                Image.open(io.BytesIO(response.data)).verify()
+
+        response = self.client.get(url, headers={'Accept': 'application/octet-stream'})
+        self.assertEqual(len(response.data), 32 * 24 * 3)
+        self.assertEqual((response.headers['X-Image-Width'], response.headers['X-Image-Height']),
+                         ('32', '24'))
+
+    def test_view_parameters(self):
+        """The view comes from the query string and is served as a PNG."""
+        response = self.client.get('/fractal.png?width=32&height=24&cx=-0.5&zoom=4&palette=fire')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+        expected = fractal.generate_mandelbrot(32, 24, 256, center=(-0.5, 0.0), zoom=4.0,
+                                               palette='fire')
+        np.testing.assert_array_equal(np.asarray(Image.open(io.BytesIO(response.data))),
+                                      np.asarray(expected))
+
+    def test_etag_revalidation(self):
+        """A matching ETag is answered with 304 and no body."""
+        url = '/fractal.png?width=40&height=30'
+        etag = self.client.get(url).headers['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_streamed_png_matches(self):
+        """?stream=1 sends the same pixels as a regular render."""
+        # A max_iter of its own, so the stream is not answered from the cache
+        url = '/fractal.png?width=48&height=40&max_iter=301&preset=fast'
+        streamed = self.client.get(url + '&stream=1').data
+        expected = np.asarray(fractal.generate_mandelbrot(48, 40, 301, main.RENDER_BACKEND))
+        np.testing.assert_array_equal(np.asarray(Image.open(io.BytesIO(streamed))), expected)
+        # The finished stream is cached and served as is
+        self.assertEqual(self.client.get(url).data, streamed)
+
+    def test_progressive_passes(self):
+        """Progressive rendering sends coarse passes first and the full size last."""
+        body = self.client.get('/fractal/progressive?width=128&height=96&max_iter=302').get_data(True)
+        events = [block.split('\n') for block in body.strip().split('\n\n')]
+        self.assertEqual([lines[0] for lines in events], ['event: pass'] * 4 + ['event: done'])
+        passes = [json.loads(lines[1][len('data: '):]) for lines in events[:-1]]
+        self.assertEqual([(p['scale'], p['width']) for p in passes], [(8, 16), (4, 32), (2, 64), (1, 128)])
+
+    def test_metrics(self):
+        """/metrics reports the queue and the cache in the Prometheus text format."""
+        self.client.get('/fractal.png?width=24&height=24&max_iter=303')
+        body = self.client.get('/metrics').get_data(True)
+        metrics = dict(line.rsplit(' ', 1) for line in body.splitlines())
+        self.assertGreaterEqual(int(metrics['fractal_queue_submitted_total']), 1)
+        self.assertGreaterEqual(int(metrics['fractal_cache_misses_total']), 1)
+
+    def test_parameter_validation(self):
+        """Out-of-range and unknown values, and the python backend, are rejected."""
+        for query in ('width=99999', 'max_iter=0', 'zoom=abc', 'palette=neon', 'backend=gpu',
+                      'backend=python', 'smooth=2', 'strategy=guess', 'format=gif', 'preset=tiny'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/fractal.png?{query}').status_code, 400)
+        self.assertEqual(self.client.get('/tiles/2/4/0.png').status_code, 404)
+
+    def test_tile(self):
+        """A tile is the 256 x 256 render of its square of the plane."""
+        response = self.client.get('/tiles/1/0/1.png?max_iter=50')
+        self.assertEqual(response.status_code, 200)
+        tile = np.asarray(Image.open(io.BytesIO(response.data)))
+        np.testing.assert_array_equal(tile, np.asarray(fractal.generate_tile(1, 0, 1, 50)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import threading
+from fractal import get_tile_image
+from render_cache import make_key
+from render_queue import QueueBusy
+
+# Deepest zoom level served; beyond this float64 runs out of precision
+MAX_ZOOM = 32
+# Render queue client that prefetches are submitted as
+PREFETCH_CLIENT = 'tile-prefetch'
+
+def tile_key(z, x, y, **options):
+    """Returns the render cache key of a tile rendered with the given options."""
+    return make_key(kind='tile', z=z, x=x, y=y, **options)
+
+def render_tile(z, x, y, **options):
+    """Renders a tile to PNG bytes; options are passed to get_tile_image."""
+    return get_tile_image(z, x, y, **options)
+
+def neighbours(z, x, y):
+    """Yields the tiles surrounding (x, y) on zoom level z."""
+    n = 2 ** z
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if (dx or dy) and 0 <= x + dx < n and 0 <= y + dy < n:
+                yield x + dx, y + dy
+
+class TilePrefetcher:
+    """Renders tiles next to the ones being viewed into the cache on the render queue.
+
+    Prefetches are submitted under their own client, at most max_pending at a
+    time, and only while the queue is less than half full, so they never
+    crowd out renders that a client is waiting for. Whatever does not fit is
+    dropped; the tile is rendered on demand if it is ever requested.
+    """
+
+    def __init__(self, cache, render_queue, max_pending=4):
+        self.cache = cache
+        self.render_queue = render_queue
+        self.max_pending = max_pending
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _has_room(self):
+        """True while the render queue is less than half full."""
+        return self.render_queue.depth() * 2 < self.render_queue.max_depth
+
+    def prefetch_around(self, z, x, y, **options):
+        """Queues the neighbours of a tile that are neither cached nor pending."""
+        for nx, ny in neighbours(z, x, y):
+            key = tile_key(z, nx, ny, **options)
+            if key in self.cache:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                if len(self._pending) >= self.max_pending or not self._has_room():
+                    return
+                self._pending.add(key)
+
+            def job(key=key, nx=nx, ny=ny):
+                data = render_tile(z, nx, ny, **options)
+                self.cache.put(key, data)
+                return data
+
+            try:
+                future = self.render_queue.submit(key, job, PREFETCH_CLIENT)
+            except QueueBusy:
+                with self._lock:
+                    self._pending.discard(key)
+                return
+            future.add_done_callback(lambda _, key=key: self._done(key))
+
+    def _done(self, key):
+        """Frees the pending slot of a finished prefetch."""
+        with self._lock:
+            self._pending.discard(key)